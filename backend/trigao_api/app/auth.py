@@ -1,31 +1,115 @@
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from . import crud, models, schemas
-from .database import SessionLocal
+from . import crud_async, models, schemas
+from .cache import TTLCache
+from .database import AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal
 
 # --- Configuração de Senha e Token ---
 SECRET_KEY = os.getenv("SECRET_KEY", "uma_chave_secreta_padrao_para_testes")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes com custo menor que BCRYPT_ROUNDS são refeitos no próximo login bem-sucedido
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# jose e passlib/bcrypt só são importados no primeiro token ou senha: não pesam na subida do worker
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+def __getattr__(name: str):
+    # Compatibilidade com `auth.pwd_context`
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
+# Streams (server-sent events): o token também pode vir em ?access_token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token", auto_error=False)
+
+# --- Cache de Autenticação ---
+# Evita decodificar o JWT e consultar a tabela de usuários a cada requisição.
+# O cache é por processo; o TTL limita por quanto tempo outro worker pode ver dados antigos.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 1024))
+
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)  # username -> schemas.User
+token_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS)  # token -> schemas.TokenData
+
+# Rotas somente leitura usam a réplica (DATABASE_READ_URL). Quem acabou de gravar lê do
+# banco principal por READ_YOUR_WRITES_SECONDS, para não ver os próprios dados atrasados
+# pela replicação. A marcação é por processo: em outro worker, get_single_order ainda
+# recorre ao principal quando o pedido não está na réplica.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 10))
+
+recent_writers = TTLCache(maxsize=USER_CACHE_MAX_SIZE * 8, ttl=READ_YOUR_WRITES_SECONDS)  # user_id -> True
+
+def invalidate_user_cache(username: str):
+    """Remove um usuário do cache (ex.: após desativação ou troca de perfil)."""
+    user_cache.pop(username)
+
+def clear_auth_caches():
+    user_cache.clear()
+    token_cache.clear()
+    recent_writers.clear()
 
 # --- Funções de Hash e Token ---
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Verifica a senha e, se o hash estiver desatualizado, retorna também um novo hash."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# --- Verificação de Senha Fora do Event Loop ---
+# O bcrypt leva dezenas de milissegundos de CPU; no event loop ele travaria todas as
+# outras requisições do worker. Ele roda em um executor dedicado e limitado, e o
+# excesso de logins simultâneos é recusado (503) em vez de acumular sem limite.
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", 2))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", 32))
+
+class PasswordVerifier:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Muitas tentativas de login simultâneas. Tente novamente em instantes.",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, verify_and_update_password, plain_password, hashed_password)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+password_verifier = PasswordVerifier(max_workers=LOGIN_MAX_CONCURRENCY, max_pending=LOGIN_MAX_PENDING)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,6 +118,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -45,25 +130,44 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    return await user_from_token(token, db)
+
+async def user_from_token(token: str, db: AsyncSession) -> schemas.User:
+    """Valida o token JWT e retorna o usuário (ambos em cache). Lança 401 se for inválido."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")
-        if username is None or role is None:
+    token_data = token_cache.get(token)
+    if token_data is None:
+        from jose import JWTError, jwt
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            role: str = payload.get("role")
+            if username is None or role is None:
+                raise credentials_exception
+            token_data = schemas.TokenData(username=username, role=role)
+        except (JWTError, ValidationError):
             raise credentials_exception
-        token_data = schemas.TokenData(username=username, role=role)
-    except (JWTError, ValidationError):
-        raise credentials_exception
-    
-    user = crud.get_user_by_username(db, username=token_data.username)
+        # O token decodificado nunca fica no cache além da sua expiração
+        expires_in = payload["exp"] - time.time() if "exp" in payload else None
+        token_cache.set(token, token_data, ttl=expires_in)
+
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        db_user = await crud_async.get_user_by_username(db, username=token_data.username)
+        if db_user is None:
+            raise credentials_exception
+        # Guarda um instantâneo desvinculado da sessão, que pode ser compartilhado entre requisições
+        user = schemas.User.model_validate(db_user)
+        user_cache.set(token_data.username, user)
     return user
 
 async def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
@@ -71,6 +175,24 @@ async def get_current_active_user(current_user: schemas.User = Depends(get_curre
         raise HTTPException(status_code=400, detail="Usuário inativo")
     return current_user
 
+async def get_current_active_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Usuário de uma rota de stream. O EventSource do navegador não envia o cabeçalho
+    Authorization, então o token também é aceito no parâmetro `access_token`.
+    """
+    token = token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_active_user(await user_from_token(token, db))
+
 class RoleChecker:
     def __init__(self, allowed_roles: List[schemas.Role]):
         self.allowed_roles = [role.value for role in allowed_roles]
@@ -81,4 +203,38 @@ class RoleChecker:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Você não tem permissão para executar esta ação!"
             )
-        return current_user
\ No newline at end of file
+        return current_user
+
+class StreamRoleChecker(RoleChecker):
+    """RoleChecker das rotas de stream (token no cabeçalho ou em `access_token`)."""
+
+    def __call__(self, current_user: schemas.User = Depends(get_current_active_stream_user)):
+        return super().__call__(current_user)
+
+# --- Sessões de Leitura (Réplica) ---
+def mark_recent_write(user_id: int):
+    """Direciona as leituras do usuário ao banco principal pelos próximos READ_YOUR_WRITES_SECONDS."""
+    recent_writers.set(user_id, True)
+
+def wrote_recently(user_id: int) -> bool:
+    return recent_writers.get(user_id, False)
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_replica_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(
+    current_user: schemas.User = Depends(get_current_active_user),
+    primary_db: AsyncSession = Depends(get_async_db),
+    replica_db: AsyncSession = Depends(get_async_replica_db),
+):
+    """Sessão de leitura da requisição: a réplica, ou o principal logo após uma gravação do usuário."""
+    # As sessões só abrem conexão no primeiro uso: a que não for escolhida não custa nada
+    return primary_db if wrote_recently(current_user.id) else replica_db
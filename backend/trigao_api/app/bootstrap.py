@@ -0,0 +1,41 @@
+"""
+Preparação do banco, executada explicitamente (python init_db.py) e não na subida da
+API: criar o schema e o administrador inicial envolve DDL e bcrypt, e vários workers
+subindo juntos disputariam o schema e atrasariam a prontidão.
+"""
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas
+from .database import get_engine
+
+DEFAULT_ADMIN_USERNAME = "admin"
+DEFAULT_ADMIN_EMAIL = "admin@trigao.com"
+DEFAULT_ADMIN_PASSWORD = "123456"  # Em produção, defina ADMIN_PASSWORD
+
+logger = logging.getLogger(__name__)
+
+def create_schema() -> None:
+    """Cria as tabelas e índices que ainda não existem (idempotente)."""
+    models.Base.metadata.create_all(bind=get_engine())
+
+def ensure_admin_user(db: Session, username: Optional[str] = None, email: Optional[str] = None,
+                      password: Optional[str] = None) -> Optional[models.User]:
+    """Cria o administrador inicial se ele ainda não existir. Retorna o usuário criado, ou None."""
+    username = username or os.getenv("ADMIN_USERNAME", DEFAULT_ADMIN_USERNAME)
+    if crud.get_user_by_username(db, username=username):
+        return None
+    if password is None:
+        password = os.getenv("ADMIN_PASSWORD")
+        if not password:
+            logger.warning("ADMIN_PASSWORD não definida: usando a senha padrão do administrador. Troque-a em produção.")
+            password = DEFAULT_ADMIN_PASSWORD
+    user_in = schemas.UserCreate(
+        username=username,
+        email=email or os.getenv("ADMIN_EMAIL", DEFAULT_ADMIN_EMAIL),
+        password=password,
+    )
+    return crud.create_user(db=db, user=user_in, role=schemas.Role.ADMIN)
@@ -0,0 +1,191 @@
+"""
+Importação do catálogo de produtos do fornecedor (formato de produtos-trigao.json:
+{"<seção>": [produto, ...], ...}) com leitura incremental e upsert em lotes.
+"""
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import IO, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas
+from .database import upsert_insert
+
+IMPORT_BATCH_SIZE = 500
+READ_CHUNK_SIZE = 64 * 1024
+
+UPDATABLE_COLUMNS = ("product_name", "unit", "tax", "section", "price")
+UNIT_MAX_LENGTH = models.Product.__table__.c.unit.type.length
+
+logger = logging.getLogger(__name__)
+
+# --- Leitura Incremental do JSON ---
+
+class _JSONStream:
+    """Buffer sobre um arquivo de texto que decodifica valores JSON à medida que chegam."""
+
+    def __init__(self, fp: IO[str], chunk_size: int):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._fp.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Retorna o próximo caractere significativo (sem consumi-lo), ou '' no fim do arquivo."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inválido: esperado '{char}', encontrado '{found or 'fim do arquivo'}'")
+        self._pos += 1
+
+    def value(self):
+        """Decodifica o próximo valor JSON completo, lendo mais do arquivo se necessário."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise ValueError("JSON inválido: valor incompleto no fim do arquivo")
+            # Um número no fim do buffer pode continuar no próximo bloco
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+def iter_catalog_products(fp: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, dict]]:
+    """Percorre o arquivo produzindo (seção, produto) sem carregar o JSON inteiro em memória."""
+    stream = _JSONStream(fp, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        section_name = stream.value()
+        stream.expect(":")
+        stream.expect("[")
+        if stream.peek() != "]":
+            while True:
+                yield section_name, stream.value()
+                if stream.peek() != ",":
+                    break
+                stream.expect(",")
+        stream.expect("]")
+        if stream.peek() != ",":
+            break
+        stream.expect(",")
+    stream.expect("}")
+
+# --- Normalização ---
+
+def _optional_text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+def normalize_product(product_data: dict) -> Optional[dict]:
+    """Aplica as regras de importação a um produto do arquivo. Retorna None se deve ser ignorado."""
+    if not isinstance(product_data, dict):
+        return None
+
+    # Pula produtos marcados como inativos
+    product_name = product_data.get("product_name")
+    if isinstance(product_name, str) and "inativo" in product_name.lower():
+        return None
+
+    code = str(product_data.get("code"))
+    if not code or code == "None":
+        logger.warning(f"Produto '{product_name}' sem código. Pulando.")
+        return None
+
+    # Nome e unidade são obrigatórios no banco: uma linha sem eles derrubaria o lote inteiro
+    if not isinstance(product_name, str) or not product_name.strip():
+        logger.warning(f"Produto com código '{code}' sem nome. Pulando.")
+        return None
+    unit = product_data.get("unit")
+    if not isinstance(unit, str) or not unit.strip() or len(unit) > UNIT_MAX_LENGTH:
+        logger.warning(f"Unidade inválida ({unit!r}) para o produto '{product_name}'. Pulando.")
+        return None
+
+    # Valida e converte o preço para Decimal
+    try:
+        price = Decimal(str(product_data.get("price", "0")))
+    except InvalidOperation:
+        logger.warning(f"Preço inválido para o produto '{product_name}'. Usando 0.0.")
+        price = Decimal("0.0")
+
+    return {
+        "code": code,
+        "product_name": product_name,
+        "unit": unit,
+        "tax": _optional_text(product_data.get("tax")),
+        "section": _optional_text(product_data.get("section")),
+        "price": float(price),
+    }
+
+# --- Upsert em Lotes ---
+
+def _upsert_batch(db: Session, insert, rows: list, version: int) -> int:
+    stmt = insert(models.Product).values([{**row, "version": version} for row in rows])
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Product.code],
+        set_={**{column: excluded[column] for column in UPDATABLE_COLUMNS}, "version": excluded.version},
+        # Só reescreve (e muda a versão de) produtos que realmente mudaram
+        where=or_(*(getattr(models.Product, column).is_distinct_from(excluded[column]) for column in UPDATABLE_COLUMNS)),
+    )
+    return db.execute(stmt).rowcount
+
+def import_catalog(db: Session, fp: IO[str], batch_size: int = IMPORT_BATCH_SIZE) -> schemas.CatalogImportResult:
+    """
+    Importa o catálogo do arquivo em uma única transação: produtos novos são inseridos
+    e produtos existentes (mesmo `code`) têm nome, unidade, seção e preço atualizados.
+    Códigos repetidos no arquivo são resolvidos em memória (vale a última ocorrência).
+    """
+    insert = upsert_insert(db)
+
+    products: Dict[str, dict] = {}
+    read = skipped = 0
+    for _section_name, product_data in iter_catalog_products(fp):
+        read += 1
+        row = normalize_product(product_data)
+        if row is None:
+            skipped += 1
+            continue
+        products[row["code"]] = row
+
+    version = crud.bump_catalog_version(db)
+    rows = list(products.values())
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        written += _upsert_batch(db, insert, rows[start:start + batch_size], version)
+
+    if written:
+        db.commit()
+    else:
+        # Nada mudou: descarta também o incremento de versão, mantendo as ETags válidas
+        db.rollback()
+        version = crud.get_catalog_version(db)
+
+    return schemas.CatalogImportResult(read=read, skipped=skipped, unique=len(rows), written=written, version=version)
@@ -0,0 +1,92 @@
+"""
+Snapshot do catálogo completo, já codificado em JSON e comprimido (gzip e, se o
+pacote brotli estiver instalado, br), mantido em memória. Como o índice de busca,
+é reconstruído sob demanda quando a versão do catálogo muda: create/update/delete
+de produtos (e a importação) incrementam a versão no banco, então cada worker
+percebe a mudança na requisição seguinte, sem precisar de comunicação entre eles.
+"""
+import asyncio
+import gzip
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud_async, models
+
+try:
+    import brotli
+except ImportError:  # Dependência opcional: sem ela, só gzip
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# Ordem de preferência quando o cliente aceita mais de uma codificação
+PREFERRED_ENCODINGS = ("br", "gzip", "identity")
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    bodies: Dict[str, bytes]  # codificação -> corpo ("identity" = JSON sem compressão)
+
+def build_snapshot(version: int, rows: list) -> CatalogSnapshot:
+    body = orjson.dumps(rows)
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return CatalogSnapshot(version=version, bodies=bodies)
+
+def choose_encoding(accept_encoding: Optional[str], available) -> str:
+    """Escolhe a codificação a partir do Accept-Encoding (respeita q=0 e '*'). Padrão: identity."""
+    weights: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    def weight(encoding: str) -> float:
+        if encoding in weights:
+            return weights[encoding]
+        if "*" in weights:
+            return weights["*"]
+        # identity não listada é aceita, mas só como último recurso
+        return 0.001 if encoding == "identity" else 0.0
+
+    candidates = [encoding for encoding in PREFERRED_ENCODINGS if encoding in available and weight(encoding) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=weight)  # max é estável: empate fica com a ordem de preferência
+
+_snapshot: Optional[CatalogSnapshot] = None
+_lock = asyncio.Lock()
+
+async def get_catalog_snapshot(db: AsyncSession) -> CatalogSnapshot:
+    """Retorna o snapshot atual, reconstruindo-o (uma vez por worker) se o catálogo mudou."""
+    global _snapshot
+    version = await crud_async.get_catalog_version(db)
+    if _snapshot is not None and _snapshot.version == version:
+        return _snapshot
+    async with _lock:
+        # Outra requisição pode ter reconstruído enquanto esperávamos
+        if _snapshot is None or _snapshot.version != version:
+            result = await db.execute(select(*crud_async.PRODUCT_ROW_COLUMNS).order_by(models.Product.id))
+            rows = [row._asdict() for row in result]
+            # Compressão fora do event loop
+            _snapshot = await asyncio.to_thread(build_snapshot, version, rows)
+        return _snapshot
+
+def reset_catalog_snapshot():
+    global _snapshot
+    _snapshot = None
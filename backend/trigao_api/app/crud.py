@@ -1,6 +1,8 @@
-from typing import List
-from sqlalchemy.orm import Session
-from . import models, schemas, auth
+from datetime import date, timedelta
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from sqlalchemy import Date, insert, literal, select, tuple_, update
+from sqlalchemy.orm import Session, selectinload
+from . import models, schemas, auth, order_feed, reports
 
 # --- CRUD de Usuário ---
 
@@ -13,16 +15,27 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(models.User).order_by(models.User.id)
+    if after_id is not None:
+        return query.filter(models.User.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def update_password_hash(db: Session, user: models.User, hashed_password: str) -> models.User:
+    user.hashed_password = hashed_password
+    db.commit()
+    return user
 
 def authenticate_user(db: Session, username: str, password: str) -> models.User | None:
     """Verifica se um usuário existe e se a senha está correta."""
     user = get_user_by_username(db, username=username)
     if not user:
         return None
-    if not auth.verify_password(password, user.hashed_password):
+    valid, new_hash = auth.verify_and_update_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        update_password_hash(db, user, new_hash)
     return user
 
 def create_user(db: Session, user: schemas.UserCreate, role: schemas.Role = schemas.Role.USER):
@@ -39,6 +52,22 @@ def create_user(db: Session, user: schemas.UserCreate, role: schemas.Role = sche
     db.refresh(db_user)
     return db_user
 
+def set_user_active(db: Session, user: models.User, is_active: bool) -> models.User:
+    """Ativa ou desativa um usuário e invalida o cache de autenticação."""
+    user.is_active = is_active
+    db.commit()
+    db.refresh(user)
+    auth.invalidate_user_cache(user.username)
+    return user
+
+def set_user_role(db: Session, user: models.User, role: schemas.Role) -> models.User:
+    """Altera o perfil de um usuário e invalida o cache de autenticação."""
+    user.role = role.value
+    db.commit()
+    db.refresh(user)
+    auth.invalidate_user_cache(user.username)
+    return user
+
 # --- CRUD de Produto ---
 
 def get_product(db: Session, product_id: int):
@@ -47,11 +76,67 @@ def get_product(db: Session, product_id: int):
 def get_product_by_code(db: Session, code: str):
     return db.query(models.Product).filter(models.Product.code == code).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Product).offset(skip).limit(limit).all()
+def paginate_products(query, skip: int, limit: int, after_id: Optional[int]):
+    """Ordena por ID e pagina por OFFSET ou, com `after_id`, por chave (keyset). Aceita Query ou select()."""
+    query = query.order_by(models.Product.id)
+    if after_id is not None:
+        return query.filter(models.Product.id > after_id).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def get_products(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Lista produtos ordenados por ID. Com `after_id`, pagina por chave (keyset) em vez de OFFSET."""
+    return paginate_products(db.query(models.Product), skip, limit, after_id).all()
+
+def get_products_by_ids(db: Session, product_ids: Iterable[int]) -> Dict[int, models.Product]:
+    """Busca vários produtos em uma única consulta (IN) e retorna um mapa id -> produto."""
+    ids = set(product_ids)
+    if not ids:
+        return {}
+    products = db.query(models.Product).filter(models.Product.id.in_(ids)).all()
+    return {product.id: product for product in products}
+
+# --- Versão do Catálogo ---
+
+CATALOG_STATE_ID = 1
+
+def get_catalog_version(db: Session) -> int:
+    """Retorna a versão atual do catálogo (0 se nunca foi alterado)."""
+    version = db.query(models.CatalogState.version).filter(models.CatalogState.id == CATALOG_STATE_ID).scalar()
+    return version or 0
+
+def bump_catalog_version(db: Session) -> int:
+    """
+    Incrementa a versão do catálogo na transação corrente e retorna o novo valor.
+    O UPDATE bloqueia a linha até o commit, então escritas concorrentes recebem
+    versões em ordem de confirmação.
+    """
+    result = db.execute(
+        update(models.CatalogState)
+        .where(models.CatalogState.id == CATALOG_STATE_ID)
+        .values(version=models.CatalogState.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(models.CatalogState(id=CATALOG_STATE_ID, version=1))
+        db.flush()
+        return 1
+    return get_catalog_version(db)
+
+def get_catalog_changes(db: Session, since: int) -> schemas.CatalogChanges:
+    """Lista os produtos criados/alterados e os IDs removidos após a versão `since`."""
+    # A versão é lida antes das alterações: o cliente nunca recebe uma versão à frente dos dados
+    version = get_catalog_version(db)
+    updated = db.query(models.Product).filter(models.Product.version > since).order_by(models.Product.id).all()
+    updated_ids = {product.id for product in updated}
+    deleted_ids = db.query(models.ProductTombstone.product_id).filter(models.ProductTombstone.version > since).distinct().all()
+    return schemas.CatalogChanges(
+        version=version,
+        updated=updated,
+        deleted_ids=sorted(product_id for (product_id,) in deleted_ids if product_id not in updated_ids),
+    )
 
 def create_product(db: Session, product: schemas.ProductCreate):
     db_product = models.Product(**product.dict())
+    db_product.version = bump_catalog_version(db)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
@@ -62,6 +147,7 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
     if db_product:
         for key, value in product_update.dict().items():
             setattr(db_product, key, value)
+        db_product.version = bump_catalog_version(db)
         db.commit()
         db.refresh(db_product)
     return db_product
@@ -69,98 +155,292 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
 def delete_product(db: Session, product_id: int):
     db_product = get_product(db, product_id)
     if db_product:
+        db.add(models.ProductTombstone(product_id=db_product.id, code=db_product.code, version=bump_catalog_version(db)))
         db.delete(db_product)
         db.commit()
     return db_product
-def create_order(db: Session, user_id: int, items_in: List[schemas.OrderItemCreate]) -> models.Order:
-    """
-    Cria um novo pedido no banco de dados.
-    """
-    total_amount = 0
-    order_items = []
 
-    # Calcula o valor total e prepara os itens do pedido
-    for item_in in items_in:
-        product = get_product(db, item_in.product_id)
-        if not product:
-            # Em uma aplicação real, você poderia lançar uma exceção aqui
-            continue
-        
-        item_price = product.price * item_in.quantity
-        total_amount += item_price
-        
-        order_item = models.OrderItem(
-            product_id=item_in.product_id,
-            quantity=item_in.quantity,
-            price=product.price # Salva o preço unitário no momento da compra
-        )
-        order_items.append(order_item)
+# --- Estoque ---
+# Produtos com stock NULL não têm estoque controlado. Nos demais, o pedido reserva o
+# estoque com um UPDATE condicional por produto (stock >= quantidade), sempre em ordem de
+# ID: transações concorrentes bloqueiam as linhas na mesma ordem e não entram em deadlock.
 
-    # Cria a instância do pedido
-    db_order = models.Order(
-        user_id=user_id,
-        total_amount=total_amount,
-        items=order_items # Associa os itens ao pedido
+class InsufficientStockError(ValueError):
+    """Estoque insuficiente para um produto do pedido."""
+
+def set_product_stock(db: Session, product_id: int, stock: Optional[int]) -> Optional[models.Product]:
+    db_product = get_product(db, product_id)
+    if db_product:
+        db_product.stock = stock
+        db.commit()
+        db.refresh(db_product)
+    return db_product
+
+def get_stock_levels(db: Session) -> List[schemas.ProductStock]:
+    """Estoque atual dos produtos com controle de estoque."""
+    rows = db.execute(select(models.Product.id, models.Product.stock).where(models.Product.stock.is_not(None)).order_by(models.Product.id))
+    return [schemas.ProductStock(id=product_id, stock=stock) for product_id, stock in rows]
+
+def stock_demand(orders: Iterable[Tuple[Hashable, models.Order]], products: Dict[int, models.Product]) -> Dict[int, List[Tuple[Hashable, int]]]:
+    """Quantidade pedida de cada produto com estoque controlado, por pedido, em ordem de produto."""
+    demand: Dict[int, Dict[Hashable, int]] = {}
+    for key, order in orders:
+        for item in order.items:
+            if products[item.product_id].stock is not None:
+                per_order = demand.setdefault(item.product_id, {})
+                per_order[key] = per_order.get(key, 0) + item.quantity
+    return {product_id: list(per_order.items()) for product_id, per_order in sorted(demand.items())}
+
+def _check_stock_quantity(quantity: int) -> None:
+    # Uma quantidade negativa passaria em "stock >= quantidade" e aumentaria o estoque
+    if quantity <= 0:
+        raise ValueError(f"Quantidade inválida: {quantity}.")
+
+def reserve_stock_statement(product_id: int, quantity: int):
+    _check_stock_quantity(quantity)
+    return (
+        update(models.Product)
+        .where(models.Product.id == product_id, models.Product.stock >= quantity)
+        .values(stock=models.Product.stock - quantity)
     )
 
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    
-    return db_order
+def release_stock_statement(product_id: int, quantity: int):
+    _check_stock_quantity(quantity)
+    return update(models.Product).where(models.Product.id == product_id).values(stock=models.Product.stock + quantity)
+
+def locked_stock_query(product_id: int):
+    return select(models.Product.stock).where(models.Product.id == product_id).with_for_update()
+
+def allocate_stock(available: int, requests: List[Tuple[Hashable, int]]) -> Tuple[int, List[Hashable]]:
+    """Atende os pedidos na ordem enquanto houver estoque. Retorna o total reservado e os pedidos recusados."""
+    granted, refused = 0, []
+    for key, quantity in requests:
+        if granted + quantity <= available:
+            granted += quantity
+        else:
+            refused.append(key)
+    return granted, refused
+
+def insufficient_stock(product: models.Product, available: int, requested: int) -> InsufficientStockError:
+    return InsufficientStockError(f"Estoque insuficiente para {product.product_name} (disponível: {available}, pedido: {requested}).")
+
+def stock_to_release(reserved: Dict[int, List[Tuple[Hashable, int]]], failed: Dict[Hashable, InsufficientStockError]) -> List[Tuple[int, int]]:
+    """Estoque já reservado para pedidos que depois foram recusados em outro produto."""
+    releases = []
+    for product_id, requests in reserved.items():
+        quantity = sum(q for key, q in requests if key in failed)
+        if quantity:
+            releases.append((product_id, quantity))
+    return releases
+
+def reserve_stock(db: Session, orders: List[Tuple[Hashable, models.Order]], products: Dict[int, models.Product]) -> Dict[Hashable, InsufficientStockError]:
+    """
+    Reserva, na transação corrente, o estoque dos pedidos (chave, pedido montado). Retorna
+    os pedidos recusados por falta de estoque; o que já fora reservado para eles é devolvido.
+    """
+    failed: Dict[Hashable, InsufficientStockError] = {}
+    reserved: Dict[int, List[Tuple[Hashable, int]]] = {}
+    for product_id, requests in stock_demand(orders, products).items():
+        requests = [(key, quantity) for key, quantity in requests if key not in failed]
+        if not requests:
+            continue
+        total = sum(quantity for _, quantity in requests)
+        if db.execute(reserve_stock_statement(product_id, total)).rowcount:
+            reserved[product_id] = requests
+            continue
+        # Não há estoque para todos: bloqueia a linha e atende na ordem dos pedidos
+        available = db.scalar(locked_stock_query(product_id))
+        if available is None:
+            continue  # O controle de estoque foi desligado neste meio-tempo
+        granted, refused = allocate_stock(available, requests)
+        for key, quantity in requests:
+            if key in refused:
+                failed[key] = insufficient_stock(products[product_id], available, quantity)
+        if granted:
+            db.execute(reserve_stock_statement(product_id, granted))
+            reserved[product_id] = [(key, quantity) for key, quantity in requests if key not in failed]
+    for product_id, quantity in stock_to_release(reserved, failed):
+        db.execute(release_stock_statement(product_id, quantity))
+    return failed
 
 # --- CRUD de Pedidos ---
 
+# Carrega itens e produtos junto com os pedidos (uma consulta por nível),
+# evitando o N+1 na serialização de schemas.OrderRead
+ORDER_LOAD_OPTIONS = (
+    selectinload(models.Order.items).selectinload(models.OrderItem.product),
+)
+
 def get_order_by_id(db: Session, order_id: int):
     """Busca um único pedido pelo seu ID."""
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    return db.query(models.Order).options(*ORDER_LOAD_OPTIONS).filter(models.Order.id == order_id).first()
+
+def orders_created_between(start: Optional[date] = None, end: Optional[date] = None) -> list:
+    """
+    Condições para filtrar Order.created_at por um intervalo de datas (inclusivo), usando
+    o índice da coluna. Os limites vão como DATE: no SQLite, onde as datas são texto,
+    '2024-01-31' < '2024-01-31 00:00:00' mantém a comparação correta na meia-noite.
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(models.Order.created_at >= literal(start, Date))
+    if end is not None:
+        conditions.append(models.Order.created_at < literal(end + timedelta(days=1), Date))
+    return conditions
 
-def get_all_orders(db: Session, skip: int = 0, limit: int = 100):
+def _orders_after(query, after_id: int):
+    """
+    Restringe a consulta aos pedidos posteriores (na ordem created_at DESC, id DESC)
+    ao pedido `after_id`. A posição (created_at, id) é lida do próprio banco, usando
+    a chave primária, para que a comparação use os valores exatamente como armazenados.
+    """
+    cursor_created_at = select(models.Order.created_at).where(models.Order.id == after_id).scalar_subquery()
+    return query.filter(tuple_(models.Order.created_at, models.Order.id) < tuple_(cursor_created_at, after_id))
+
+def paginate_orders(query, skip: int, limit: int, after_id: Optional[int]):
+    """Ordena do mais recente para o mais antigo e pagina por OFFSET ou keyset. Aceita Query ou select()."""
+    query = query.order_by(models.Order.created_at.desc(), models.Order.id.desc())
+    if after_id is not None:
+        return _orders_after(query, after_id).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def get_all_orders(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
     """Busca todos os pedidos, para uso de administradores."""
-    return db.query(models.Order).order_by(models.Order.created_at.desc()).offset(skip).limit(limit).all()
+    return paginate_orders(db.query(models.Order).options(*ORDER_LOAD_OPTIONS), skip, limit, after_id).all()
 
-def get_orders_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+def get_orders_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
     """Busca todos os pedidos de um usuário específico."""
-    return db.query(models.Order).filter(models.Order.user_id == user_id).order_by(models.Order.created_at.desc()).offset(skip).limit(limit).all()
+    query = db.query(models.Order).options(*ORDER_LOAD_OPTIONS).filter(models.Order.user_id == user_id)
+    return paginate_orders(query, skip, limit, after_id).all()
 
-def create_order(db: Session, order_in: schemas.OrderCreate, user_id: int) -> models.Order:
+def build_order(order_in: schemas.OrderCreate, products: Dict[int, models.Product], user_id: int) -> models.Order:
     """
-    Cria um novo pedido de forma transacional e segura.
-    - Valida a existência dos produtos.
-    - Busca os preços do banco de dados para evitar adulteração.
+    Monta (sem persistir) o pedido a partir dos produtos já carregados.
+    - Valida a existência de todos os produtos, reportando os ausentes de uma vez.
+    - Usa os preços do banco de dados para evitar adulteração.
     - Calcula o valor total.
-    - Salva tudo em um único commit.
     """
     total_amount = 0.0
     order_items_to_create = []
 
-    # Validação e cálculo seguro dos itens
+    missing_ids = sorted({item_in.product_id for item_in in order_in.items} - products.keys())
+    if missing_ids:
+        # Lança uma exceção que será capturada pela camada da API (router)
+        if len(missing_ids) == 1:
+            raise ValueError(f"Produto com ID {missing_ids[0]} não encontrado.")
+        raise ValueError(f"Produtos com IDs {', '.join(map(str, missing_ids))} não encontrados.")
+
+    # Cálculo seguro dos itens
     for item_in in order_in.items:
-        product = get_product(db, product_id=item_in.product_id)
-        if not product:
-            # Lança uma exceção que será capturada pela camada da API (router)
-            raise ValueError(f"Produto com ID {item_in.product_id} não encontrado.")
-        
+        product = products[item_in.product_id]
         item_total_price = product.price * item_in.quantity
         total_amount += item_total_price
         
         order_item = models.OrderItem(
             product_id=item_in.product_id,
             quantity=item_in.quantity,
-            price=product.price  # Preço é pego do banco, não da requisição do cliente
+            price=product.price,  # Preço é pego do banco, não da requisição do cliente
+            section=product.section,  # Os relatórios agrupam pela seção na data da venda
         )
         order_items_to_create.append(order_item)
 
     # Criação do pedido com seus itens
-    db_order = models.Order(
+    return models.Order(
         user_id=user_id,
         total_amount=total_amount,
         items=order_items_to_create
     )
 
-    # Operação atômica: adiciona e commita
+def order_item_rows(order_id: int, items: Iterable[models.OrderItem]) -> List[dict]:
+    """Linhas de order_items para inserção em massa (executemany, sem RETURNING)."""
+    return [
+        {"order_id": order_id, "product_id": item.product_id, "quantity": item.quantity, "price": item.price, "section": item.section}
+        for item in items
+    ]
+
+def detach_order_items(db_order: models.Order) -> List[models.OrderItem]:
+    """
+    Separa os itens do pedido montado para gravá-los com um único executemany: pelo ORM,
+    cada item seria um INSERT ... RETURNING próprio no SQLite (que não garante a ordem do RETURNING).
+    """
+    items = list(db_order.items)
+    db_order.items = []
+    return items
+
+def create_order(db: Session, order_in: schemas.OrderCreate, user_id: int) -> models.Order:
+    """
+    Cria um novo pedido de forma transacional e segura.
+    - Busca todos os produtos do pedido com uma única consulta.
+    - Valida e monta o pedido com build_order.
+    - Reserva o estoque (InsufficientStockError se faltar) e atualiza o consolidado
+      diário de vendas na mesma transação.
+    - Grava o pedido e depois todos os itens de uma vez, em um único commit.
+    """
+    products = get_products_by_ids(db, (item_in.product_id for item_in in order_in.items))
+    db_order = build_order(order_in, products, user_id)
+
+    # Operação atômica: reserva o estoque, atualiza o consolidado de vendas, grava pedido e itens e commita
+    failed = reserve_stock(db, [(None, db_order)], products)
+    if failed:
+        db.rollback()
+        raise failed[None]
+    reports.record_daily_sales(db, [db_order], products)
+    items = detach_order_items(db_order)
     db.add(db_order)
+    db.flush()
+    if items:
+        db.execute(insert(models.OrderItem), order_item_rows(db_order.id, items))
     db.commit()
+    order_feed.notify_new_orders()
     db.refresh(db_order)
     
-    return db_order
\ No newline at end of file
+    return db_order
+
+def create_orders_batch(db: Session, orders_in: List[schemas.BatchOrderCreate], default_user_id: int) -> List[schemas.OrderBatchResult]:
+    """
+    Cria vários pedidos em uma única transação.
+    - Produtos e usuários de todo o lote são buscados com uma consulta cada.
+    - Cada pedido é validado com build_order e tem o estoque reservado; pedidos inválidos
+      ou sem estoque são reportados e não impedem a criação dos demais.
+    - Pedidos e itens são inseridos em massa (executemany) e confirmados em um só commit.
+    """
+    products = get_products_by_ids(db, (item_in.product_id for order_in in orders_in for item_in in order_in.items))
+    user_ids = {order_in.user_id if order_in.user_id is not None else default_user_id for order_in in orders_in}
+    existing_user_ids = set(db.scalars(select(models.User.id).where(models.User.id.in_(user_ids))))
+
+    results: List[schemas.OrderBatchResult] = [None] * len(orders_in)
+    valid_orders = []  # (posição no lote, pedido montado)
+    for index, order_in in enumerate(orders_in):
+        user_id = order_in.user_id if order_in.user_id is not None else default_user_id
+        if user_id not in existing_user_ids:
+            results[index] = schemas.OrderBatchResult(index=index, success=False, error=f"Usuário com ID {user_id} não encontrado.")
+            continue
+        try:
+            valid_orders.append((index, build_order(order_in, products, user_id)))
+        except ValueError as e:
+            results[index] = schemas.OrderBatchResult(index=index, success=False, error=str(e))
+
+    if valid_orders:
+        failed = reserve_stock(db, valid_orders, products)
+        for index, error in failed.items():
+            results[index] = schemas.OrderBatchResult(index=index, success=False, error=str(error))
+        valid_orders = [(index, order) for index, order in valid_orders if index not in failed]
+        if not valid_orders:
+            db.rollback()
+
+    if valid_orders:
+        order_ids = db.execute(
+            insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+            [{"user_id": order.user_id, "total_amount": order.total_amount} for _, order in valid_orders],
+        ).scalars().all()
+        item_rows = [row for order_id, (_, order) in zip(order_ids, valid_orders) for row in order_item_rows(order_id, order.items)]
+        if item_rows:
+            db.execute(insert(models.OrderItem), item_rows)
+        reports.record_daily_sales(db, [order for _, order in valid_orders], products)
+        db.commit()
+        order_feed.notify_new_orders()
+
+        for order_id, (index, order) in zip(order_ids, valid_orders):
+            results[index] = schemas.OrderBatchResult(index=index, success=True, order_id=order_id, total_amount=order.total_amount)
+
+    return results
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Versões assíncronas (AsyncSession) das funções de crud.py usadas pelas rotas mais
+acessadas: autenticação, listagem de produtos e criação/listagem de pedidos.
+As regras de negócio e a montagem das consultas são compartilhadas com crud.py.
+"""
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import auth, crud, models, order_feed, reports, schemas
+
+# --- Usuário ---
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def update_password_hash(db: AsyncSession, user: models.User, hashed_password: str) -> models.User:
+    user.hashed_password = hashed_password
+    await db.commit()
+    return user
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> models.User | None:
+    """
+    Verifica usuário e senha sem bloquear o event loop: a consulta é assíncrona e o
+    bcrypt roda no executor dedicado de senhas. Hashes desatualizados são refeitos.
+    """
+    user = await get_user_by_username(db, username=username)
+    if not user:
+        return None
+    valid, new_hash = await auth.password_verifier.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        await update_password_hash(db, user, new_hash)
+    return user
+
+# --- Produto ---
+
+async def get_products_by_ids(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, models.Product]:
+    """Busca vários produtos em uma única consulta (IN) e retorna um mapa id -> produto."""
+    ids = set(product_ids)
+    if not ids:
+        return {}
+    products = await db.scalars(select(models.Product).where(models.Product.id.in_(ids)))
+    return {product.id: product for product in products}
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    version = await db.scalar(select(models.CatalogState.version).where(models.CatalogState.id == crud.CATALOG_STATE_ID))
+    return version or 0
+
+# --- Pedidos ---
+
+async def order_exists(db: AsyncSession, order_id: int) -> bool:
+    return await db.scalar(select(models.Order.id).where(models.Order.id == order_id)) is not None
+
+async def get_order_by_id(db: AsyncSession, order_id: int):
+    return await db.scalar(select(models.Order).options(*crud.ORDER_LOAD_OPTIONS).where(models.Order.id == order_id))
+
+async def reserve_stock(db: AsyncSession, orders: List[Tuple[Hashable, models.Order]],
+                        products: Dict[int, models.Product]) -> "Dict[Hashable, crud.InsufficientStockError]":
+    """Mesmo algoritmo de crud.reserve_stock: UPDATE condicional por produto, em ordem de ID."""
+    failed: Dict[Hashable, crud.InsufficientStockError] = {}
+    reserved: Dict[int, List[Tuple[Hashable, int]]] = {}
+    for product_id, requests in crud.stock_demand(orders, products).items():
+        requests = [(key, quantity) for key, quantity in requests if key not in failed]
+        if not requests:
+            continue
+        total = sum(quantity for _, quantity in requests)
+        if (await db.execute(crud.reserve_stock_statement(product_id, total))).rowcount:
+            reserved[product_id] = requests
+            continue
+        available = await db.scalar(crud.locked_stock_query(product_id))
+        if available is None:
+            continue
+        granted, refused = crud.allocate_stock(available, requests)
+        for key, quantity in requests:
+            if key in refused:
+                failed[key] = crud.insufficient_stock(products[product_id], available, quantity)
+        if granted:
+            await db.execute(crud.reserve_stock_statement(product_id, granted))
+            reserved[product_id] = [(key, quantity) for key, quantity in requests if key not in failed]
+    for product_id, quantity in crud.stock_to_release(reserved, failed):
+        await db.execute(crud.release_stock_statement(product_id, quantity))
+    return failed
+
+async def create_order(db: AsyncSession, order_in: schemas.OrderCreate, user_id: int) -> models.Order:
+    """Cria um pedido (mesmas regras de crud.create_order) e o devolve com itens e produtos carregados."""
+    products = await get_products_by_ids(db, (item_in.product_id for item_in in order_in.items))
+    db_order = crud.build_order(order_in, products, user_id)
+
+    failed = await reserve_stock(db, [(None, db_order)], products)
+    if failed:
+        await db.rollback()
+        raise failed[None]
+
+    daily_sales = reports.daily_sales_upsert(db, [db_order], products)
+    if daily_sales is not None:
+        await db.execute(daily_sales)
+    items = crud.detach_order_items(db_order)
+    db.add(db_order)
+    await db.flush()
+    if items:
+        await db.execute(insert(models.OrderItem), crud.order_item_rows(db_order.id, items))
+    await db.commit()
+    order_feed.notify_new_orders()
+    # Sem lazy loading em AsyncSession: recarrega o pedido com itens, produtos e created_at
+    db.expunge(db_order)
+    return await get_order_by_id(db, db_order.id)
+
+async def write_orders_group(db: AsyncSession, orders_in: Sequence[Tuple[schemas.OrderCreate, int]]) -> List[Union[int, ValueError]]:
+    """
+    Grava vários pedidos independentes (pedido, ID do usuário) em uma única transação,
+    com as mesmas regras de create_order. Retorna, na ordem recebida, o ID do pedido
+    criado ou o ValueError de validação daquele pedido (InsufficientStockError, se
+    faltou estoque). Ao retornar, o grupo já foi confirmado: nada é feito depois do commit.
+    """
+    products = await get_products_by_ids(db, (item_in.product_id for order_in, _ in orders_in for item_in in order_in.items))
+    results: List[Union[int, ValueError, None]] = [None] * len(orders_in)
+    valid_orders = []  # (posição, pedido montado)
+    for index, (order_in, user_id) in enumerate(orders_in):
+        try:
+            valid_orders.append((index, crud.build_order(order_in, products, user_id)))
+        except ValueError as e:
+            results[index] = e
+    if valid_orders:
+        failed = await reserve_stock(db, valid_orders, products)
+        for index, error in failed.items():
+            results[index] = error
+        valid_orders = [(index, order) for index, order in valid_orders if index not in failed]
+    if not valid_orders:
+        await db.rollback()
+        return results
+
+    daily_sales = reports.daily_sales_upsert(db, [order for _, order in valid_orders], products)
+    if daily_sales is not None:
+        await db.execute(daily_sales)
+    order_ids = (await db.execute(
+        insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True),
+        [{"user_id": order.user_id, "total_amount": order.total_amount} for _, order in valid_orders],
+    )).scalars().all()
+    item_rows = [row for order_id, (_, order) in zip(order_ids, valid_orders) for row in crud.order_item_rows(order_id, order.items)]
+    if item_rows:
+        await db.execute(insert(models.OrderItem), item_rows)
+    await db.commit()
+    for order_id, (index, _) in zip(order_ids, valid_orders):
+        results[index] = order_id
+    return results
+
+async def get_orders_by_ids(db: AsyncSession, order_ids: Sequence[int]) -> Dict[int, models.Order]:
+    """Pedidos (com itens e produtos carregados) indexados pelo ID."""
+    if not order_ids:
+        return {}
+    orders = await db.scalars(select(models.Order).options(*crud.ORDER_LOAD_OPTIONS).where(models.Order.id.in_(order_ids)))
+    return {order.id: order for order in orders}
+
+# --- Listagens Rápidas ---
+# Montam dicionários diretamente das tuplas de colunas, no formato de schemas.Product e
+# schemas.OrderRead, para serem codificados com orjson sem passar por objetos ORM e
+# validação Pydantic (que dominam o custo de CPU nas listagens grandes).
+
+PRODUCT_ROW_COLUMNS = (
+    models.Product.code, models.Product.product_name, models.Product.unit, models.Product.price,
+    models.Product.tax, models.Product.section, models.Product.id,
+)
+
+async def get_product_rows(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[dict]:
+    result = await db.execute(crud.paginate_products(select(*PRODUCT_ROW_COLUMNS), skip, limit, after_id))
+    return [row._asdict() for row in result]
+
+ORDER_ROW_COLUMNS = (models.Order.id, models.Order.user_id, models.Order.total_amount, models.Order.created_at)
+
+async def _order_rows(db: AsyncSession, query) -> List[dict]:
+    """Executa a consulta de pedidos (colunas ORDER_ROW_COLUMNS) e anexa itens e produtos com uma consulta."""
+    orders = [
+        {"id": order_id, "user_id": owner_id, "total_amount": float(total_amount), "created_at": created_at, "items": []}
+        for order_id, owner_id, total_amount, created_at in await db.execute(query)
+    ]
+    if not orders:
+        return orders
+
+    orders_by_id = {order["id"]: order for order in orders}
+    items = await db.execute(
+        select(
+            models.OrderItem.order_id, models.OrderItem.product_id, models.OrderItem.quantity, models.OrderItem.id,
+            models.OrderItem.price, models.Product.product_name, models.Product.price, models.Product.unit,
+        )
+        .join(models.Product, models.Product.id == models.OrderItem.product_id)
+        .where(models.OrderItem.order_id.in_(orders_by_id))
+        .order_by(models.OrderItem.id)
+    )
+    for order_id, product_id, quantity, item_id, item_price, product_name, product_price, unit in items:
+        orders_by_id[order_id]["items"].append({
+            "product_id": product_id,
+            "quantity": quantity,
+            "id": item_id,
+            "price": float(item_price),
+            "product": {"id": product_id, "product_name": product_name, "price": product_price, "unit": unit},
+        })
+    return orders
+
+async def get_order_rows(db: AsyncSession, user_id: Optional[int] = None, skip: int = 0, limit: int = 100,
+                         after_id: Optional[int] = None) -> List[dict]:
+    """Pedidos da página (todos, ou só os de `user_id`) com itens e produtos, em duas consultas."""
+    query = select(*ORDER_ROW_COLUMNS)
+    if user_id is not None:
+        query = query.where(models.Order.user_id == user_id)
+    return await _order_rows(db, crud.paginate_orders(query, skip, limit, after_id))
+
+# Quantidade de itens de cada pedido, contada só no índice ix_order_items_order_id
+ORDER_ITEM_COUNT = (
+    select(func.count()).where(models.OrderItem.order_id == models.Order.id)
+    .correlate(models.Order).scalar_subquery().label("item_count")
+)
+
+async def get_order_summary_rows(db: AsyncSession, user_id: Optional[int] = None, skip: int = 0, limit: int = 100,
+                                 after_id: Optional[int] = None) -> List[dict]:
+    """Pedidos da página sem itens, no formato de schemas.OrderSummary, em uma consulta."""
+    query = select(*ORDER_ROW_COLUMNS, ORDER_ITEM_COUNT)
+    if user_id is not None:
+        query = query.where(models.Order.user_id == user_id)
+    return [
+        {"id": order_id, "user_id": owner_id, "total_amount": float(total_amount), "created_at": created_at, "item_count": item_count}
+        for order_id, owner_id, total_amount, created_at, item_count in await db.execute(crud.paginate_orders(query, skip, limit, after_id))
+    ]
+
+# --- Feed de Novos Pedidos ---
+# Consultas em ordem crescente de ID, usadas por order_feed.py.
+
+async def get_latest_order_id(db: AsyncSession) -> int:
+    return await db.scalar(select(func.max(models.Order.id))) or 0
+
+async def get_order_ids_after(db: AsyncSession, after_id: int, limit: int) -> List[int]:
+    result = await db.scalars(select(models.Order.id).where(models.Order.id > after_id).order_by(models.Order.id).limit(limit))
+    return result.all()
+
+async def get_order_rows_by_ids(db: AsyncSession, order_ids: Iterable[int]) -> List[dict]:
+    return await _order_rows(db, select(*ORDER_ROW_COLUMNS).where(models.Order.id.in_(list(order_ids))).order_by(models.Order.id))
+
+async def get_order_rows_after(db: AsyncSession, after_id: int, limit: int) -> List[dict]:
+    """Pedidos com ID maior que `after_id`, do mais antigo ao mais novo."""
+    return await _order_rows(db, select(*ORDER_ROW_COLUMNS).where(models.Order.id > after_id).order_by(models.Order.id).limit(limit))
@@ -1,6 +1,12 @@
+import importlib
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
 from sqlalchemy.orm import declarative_base
 
@@ -8,6 +14,224 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+# Drivers assíncronos equivalentes aos drivers síncronos de cada banco
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    """Converte a URL síncrona (ex.: postgresql://) para o driver assíncrono (postgresql+asyncpg://)."""
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return url_obj.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (to_async_url(SQLALCHEMY_DATABASE_URL) if SQLALCHEMY_DATABASE_URL else None)
+
+# Réplica de leitura (opcional): listagens e relatórios podem ler de outro banco.
+# Sem DATABASE_READ_URL, as sessões de leitura usam o banco principal.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+ASYNC_SQLALCHEMY_READ_DATABASE_URL = os.getenv("ASYNC_DATABASE_READ_URL") or (to_async_url(SQLALCHEMY_READ_DATABASE_URL) if SQLALCHEMY_READ_DATABASE_URL else None)
+
+# Bancos com INSERT ... ON CONFLICT (upsert). O módulo do dialeto só é importado no
+# primeiro upsert: o do Postgres não pesa na subida de um worker com SQLite.
+UPSERT_DIALECTS = ("postgresql", "sqlite")
+
+def upsert_insert(db):
+    """Retorna o insert() do dialeto da sessão (síncrona ou assíncrona), com on_conflict_do_update."""
+    dialect = db.get_bind().dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise ValueError(f"Upsert não suportado para o banco '{dialect}'.")
+    return importlib.import_module(f"sqlalchemy.dialects.{dialect}").insert
+
+# --- Pool de Conexões ---
+# Cada worker do uvicorn tem os seus pools (síncrono e assíncrono): o total de conexões
+# no banco é workers x 2 x (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+class PoolWaitStats:
+    """Tempo gasto esperando uma conexão do pool, e quantas esperas terminaram em timeout."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+class _WaitTimingMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_options(url: str, poolclass) -> dict:
+    """Parâmetros de pool para create_engine. SQLite em memória mantém o pool padrão do dialeto."""
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() == "sqlite" and url_obj.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def pool_config() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout": DB_POOL_TIMEOUT,
+        "recycle": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+    }
+
+def pool_status(engine) -> dict:
+    """Fotografia do pool de um engine: conexões em uso, overflow e tempo de espera."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            pool_size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(
+            waits=wait_stats.waits,
+            total_wait_seconds=wait_stats.total_wait_seconds,
+            max_wait_seconds=wait_stats.max_wait_seconds,
+            timeouts=wait_stats.timeouts,
+        )
+    return status
+
+# --- Engines (criados sob demanda) ---
+# Importar a aplicação não abre conexões nem carrega drivers: os engines nascem na
+# primeira sessão (ou no primeiro acesso a database.engine / database.async_engine).
+
+_engine = None
+_async_engine = None
+_read_engine = None
+_async_read_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not SQLALCHEMY_DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL não configurada.")
+                _engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool))
+    return _engine
+
+def get_async_engine():
+    """Caminho assíncrono (AsyncSession), usado pelas rotas mais acessadas."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                if not ASYNC_SQLALCHEMY_DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL não configurada.")
+                _async_engine = create_async_engine(
+                    ASYNC_SQLALCHEMY_DATABASE_URL,
+                    **pool_options(ASYNC_SQLALCHEMY_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+                )
+    return _async_engine
+
+def read_replica_configured() -> bool:
+    return bool(SQLALCHEMY_READ_DATABASE_URL or os.getenv("ASYNC_DATABASE_READ_URL"))
+
+def get_read_engine():
+    """Engine da réplica de leitura, ou o engine principal se não houver réplica."""
+    global _read_engine
+    if not SQLALCHEMY_READ_DATABASE_URL:
+        return get_engine()
+    if _read_engine is None:
+        with _engine_lock:
+            if _read_engine is None:
+                _read_engine = create_engine(SQLALCHEMY_READ_DATABASE_URL, **pool_options(SQLALCHEMY_READ_DATABASE_URL, InstrumentedQueuePool))
+    return _read_engine
+
+def get_async_read_engine():
+    global _async_read_engine
+    if not ASYNC_SQLALCHEMY_READ_DATABASE_URL:
+        return get_async_engine()
+    if _async_read_engine is None:
+        with _engine_lock:
+            if _async_read_engine is None:
+                _async_read_engine = create_async_engine(
+                    ASYNC_SQLALCHEMY_READ_DATABASE_URL,
+                    **pool_options(ASYNC_SQLALCHEMY_READ_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+                )
+    return _async_read_engine
+
+def engines_created() -> bool:
+    return any(engine is not None for engine in (_engine, _async_engine, _read_engine, _async_read_engine))
+
+async def dispose_engines() -> None:
+    """Fecha as conexões dos pools já criados (no encerramento do worker)."""
+    for async_engine in (_async_engine, _async_read_engine):
+        if async_engine is not None:
+            await async_engine.dispose()
+    for engine in (_engine, _read_engine):
+        if engine is not None:
+            engine.dispose()
+
+def __getattr__(name: str):
+    # Compatibilidade com `from app.database import engine, async_engine`
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class LazySessionFactory:
+    """Envolve um sessionmaker (síncrono ou assíncrono) e só cria o engine na primeira sessão."""
+
+    def __init__(self, factory, get_bind):
+        self._factory = factory
+        self._get_bind = get_bind
+
+    def __call__(self, **kwargs):
+        if self._factory.kw.get("bind") is None:
+            self._factory.configure(bind=self._get_bind())
+        return self._factory(**kwargs)
+
+SessionLocal = LazySessionFactory(sessionmaker(autocommit=False, autoflush=False), get_engine)
+AsyncSessionLocal = LazySessionFactory(async_sessionmaker(autoflush=False, expire_on_commit=False), get_async_engine)
+ReadSessionLocal = LazySessionFactory(sessionmaker(autocommit=False, autoflush=False), get_read_engine)
+AsyncReadSessionLocal = LazySessionFactory(async_sessionmaker(autoflush=False, expire_on_commit=False), get_async_read_engine)
+
+Base = declarative_base()
@@ -0,0 +1,95 @@
+"""
+Exportação do histórico de pedidos (com itens e produtos) em CSV ou NDJSON, gerada
+em blocos a partir de um cursor do lado do servidor: a memória usada não depende do
+tamanho do período exportado.
+"""
+import csv
+import io
+import json
+from datetime import date
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+EXPORT_CHUNK_SIZE = 1000
+
+CSV_COLUMNS = [
+    "order_id", "created_at", "user_id", "total_amount",
+    "item_id", "product_id", "product_code", "product_name", "quantity", "price",
+]
+
+def _export_query(start: Optional[date], end: Optional[date]):
+    # Filtro e ordenação por (created_at, id) são servidos pelo índice ix_orders_created_at_desc (lido de trás para frente)
+    return (
+        select(
+            models.Order.id, models.Order.created_at, models.Order.user_id, models.Order.total_amount,
+            models.OrderItem.id, models.OrderItem.product_id, models.Product.code, models.Product.product_name,
+            models.OrderItem.quantity, models.OrderItem.price,
+        )
+        .outerjoin(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .outerjoin(models.Product, models.Product.id == models.OrderItem.product_id)
+        .where(*crud.orders_created_between(start, end))
+        .order_by(models.Order.created_at, models.Order.id, models.OrderItem.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+def _iter_row_chunks(db: Session, start: Optional[date], end: Optional[date]):
+    """
+    Lê as linhas em blocos com um cursor do lado do servidor (yield_per), em uma sessão
+    própria: a resposta continua sendo enviada depois que a sessão da requisição fecha.
+    """
+    with Session(bind=db.get_bind()) as export_db:
+        result = export_db.execute(_export_query(start, end))
+        yield from result.partitions()
+
+def _number(value):
+    return None if value is None else float(value)
+
+def iter_orders_csv(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[str]:
+    """Uma linha por item de pedido (pedidos sem itens aparecem com as colunas do item vazias)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for rows in _iter_row_chunks(db, start, end):
+        for (order_id, created_at, user_id, total_amount, item_id, product_id,
+             product_code, product_name, quantity, price) in rows:
+            writer.writerow([
+                order_id, created_at.isoformat() if created_at else "", user_id, _number(total_amount),
+                item_id, product_id, product_code, product_name, quantity, _number(price),
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_orders_ndjson(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[str]:
+    """Um objeto JSON por linha para cada pedido, com os itens aninhados."""
+    current = None
+    for rows in _iter_row_chunks(db, start, end):
+        lines = []
+        for (order_id, created_at, user_id, total_amount, item_id, product_id,
+             product_code, product_name, quantity, price) in rows:
+            # As linhas vêm agrupadas por pedido: um pedido novo encerra o anterior
+            if current is None or current["id"] != order_id:
+                if current is not None:
+                    lines.append(json.dumps(current, ensure_ascii=False))
+                current = {
+                    "id": order_id,
+                    "created_at": created_at.isoformat() if created_at else None,
+                    "user_id": user_id,
+                    "total_amount": _number(total_amount),
+                    "items": [],
+                }
+            if item_id is not None:
+                current["items"].append({
+                    "id": item_id, "product_id": product_id, "product_code": product_code,
+                    "product_name": product_name, "quantity": quantity, "price": _number(price),
+                })
+        if lines:
+            yield "\n".join(lines) + "\n"
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False) + "\n"
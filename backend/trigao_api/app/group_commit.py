@@ -0,0 +1,120 @@
+"""
+Gravação de pedidos em grupo (group commit), opcional: nos picos, em vez de um commit
+(e um fsync) por pedido, os pedidos que chegam juntos são gravados em uma transação
+única, a cada ORDER_GROUP_COMMIT_WINDOW_MS ou ao juntar ORDER_GROUP_COMMIT_MAX_ORDERS.
+
+A semântica vista por quem chama é a mesma do caminho normal: a resposta só sai depois
+do commit que contém o pedido; um pedido inválido (produto inexistente) falha sozinho,
+com o mesmo ValueError; e, se o grupo falhar antes do commit, cada pedido é regravado na
+sua própria transação, de modo que só os que falhariam sozinhos recebem o erro. Depois do
+commit os pedidos nunca são regravados (seriam duplicados, reservando o estoque duas vezes):
+se a recarga falhar, ela é tentada uma vez em outra sessão e, falhando de novo, quem
+esperava recebe o erro.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Set
+
+from . import crud_async, models, order_feed, schemas
+from .database import AsyncSessionLocal
+
+ORDER_GROUP_COMMIT = os.getenv("ORDER_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+ORDER_GROUP_COMMIT_WINDOW_MS = float(os.getenv("ORDER_GROUP_COMMIT_WINDOW_MS", 5))
+ORDER_GROUP_COMMIT_MAX_ORDERS = int(os.getenv("ORDER_GROUP_COMMIT_MAX_ORDERS", 64))
+
+class _PendingOrder:
+    __slots__ = ("order_in", "user_id", "future")
+
+    def __init__(self, order_in: schemas.OrderCreate, user_id: int, future: asyncio.Future):
+        self.order_in = order_in
+        self.user_id = user_id
+        self.future = future
+
+def _resolve(pending: _PendingOrder, result) -> None:
+    # O cliente pode ter desconectado (future cancelado): o pedido continua gravado, como no caminho normal
+    if pending.future.done():
+        return
+    if isinstance(result, BaseException):
+        pending.future.set_exception(result)
+    else:
+        pending.future.set_result(result)
+
+def _created_ids(written: list) -> List[int]:
+    return [result for result in written if not isinstance(result, ValueError)]
+
+class OrderGroupCommitter:
+    """
+    Agrupa os pedidos do event loop do worker. O primeiro pedido de um grupo agenda uma
+    tarefa que espera a janela (ou o grupo encher) e grava todos de uma vez.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, window_ms: float = ORDER_GROUP_COMMIT_WINDOW_MS,
+                 max_orders: int = ORDER_GROUP_COMMIT_MAX_ORDERS):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_orders = max_orders
+        self._pending: List[_PendingOrder] = []
+        self._full: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, order_in: schemas.OrderCreate, user_id: int) -> models.Order:
+        """Enfileira o pedido e espera o commit do grupo. Lança ValueError se o pedido for inválido."""
+        loop = asyncio.get_running_loop()
+        pending = _PendingOrder(order_in, user_id, loop.create_future())
+        self._pending.append(pending)
+        if len(self._pending) == 1:
+            self._full = asyncio.Event()
+            task = loop.create_task(self._collect_and_write())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif len(self._pending) >= self.max_orders:
+            self._full.set()
+        return await pending.future
+
+    async def _collect_and_write(self) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        group, self._pending = self._pending, []
+        await self._write(group)
+
+    async def _write(self, group: List[_PendingOrder]) -> None:
+        written = None
+        try:
+            async with self.session_factory() as db:
+                written = await crud_async.write_orders_group(db, [(pending.order_in, pending.user_id) for pending in group])
+                order_feed.notify_new_orders()
+                created = await crud_async.get_orders_by_ids(db, _created_ids(written))
+        except Exception as e:
+            if written is None:
+                if len(group) == 1:
+                    _resolve(group[0], e)
+                    return
+                # O grupo inteiro foi desfeito: regrava cada pedido isoladamente
+                for pending in group:
+                    await self._write([pending])
+                return
+            # O grupo já foi confirmado: só a recarga dos pedidos (ou o fechamento da sessão) falhou
+            created = await self._reload(_created_ids(written), e)
+        for pending, result in zip(group, written):
+            _resolve(pending, result if isinstance(result, ValueError) else created[result])
+
+    async def _reload(self, order_ids: List[int], error: Exception) -> Dict[int, object]:
+        """Recarrega os pedidos já gravados em outra sessão; se falhar de novo, cada um recebe o erro."""
+        try:
+            async with self.session_factory() as db:
+                return await crud_async.get_orders_by_ids(db, order_ids)
+        except Exception:
+            return {order_id: error for order_id in order_ids}
+
+_committer: Optional[OrderGroupCommitter] = None
+
+def get_order_committer() -> Optional[OrderGroupCommitter]:
+    """Dependência das rotas: o committer do worker, ou None com o group commit desligado."""
+    global _committer
+    if not ORDER_GROUP_COMMIT:
+        return None
+    if _committer is None:
+        _committer = OrderGroupCommitter()
+    return _committer
@@ -1,38 +1,28 @@
-from fastapi import FastAPI
+import secrets
+from typing import Optional
+
+from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from . import models, crud, schemas
-from .database import SessionLocal, engine
-from .routers import auth as auth_router, products as products_router, orders as orders_router
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import auth, metrics, schemas
+from .database import dispose_engines
+from .pagination import NEXT_CURSOR_HEADER
+from .routers import auth as auth_router, products as products_router, orders as orders_router, admin as admin_router, reports as reports_router, health as health_router
 
-# Cria as tabelas no banco de dados, se não existirem
-models.Base.metadata.create_all(bind=engine)
+# A importação não tem efeitos colaterais: o schema e o administrador inicial são criados
+# por `python init_db.py`, e os engines só na primeira sessão. O worker fica pronto sem
+# tocar no banco; /health/ready confirma banco e schema.
 
-# --- Nova função de ciclo de vida (lifespan) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Inicialização da aplicação
-    print("Iniciando a aplicação...")
-    db = SessionLocal()
-    try:
-        admin_user = crud.get_user_by_username(db, username="admin")
-        if not admin_user:
-            print("Criando usuário ADMIN padrão...")
-            user_in = schemas.UserCreate(
-                username="admin",
-                email="admin@trigao.com",
-                password="123456"  # Em produção, use variável de ambiente
-            )
-            crud.create_user(db=db, user=user_in, role=schemas.Role.ADMIN)
-            print("Usuário ADMIN criado com sucesso.")
-    finally:
-        db.close()
-
     yield  # A aplicação roda aqui
-
-    # Encerramento da aplicação (opcional)
-    print("Finalizando a aplicação...")
+    # Encerramento: devolve as conexões dos pools
+    await dispose_engines()
 
 # Cria a instância do FastAPI com a função de ciclo de vida
 app = FastAPI(title="Panificadora Trigão API", lifespan=lifespan)
@@ -44,15 +34,43 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", products_router.CATALOG_VERSION_HEADER, products_router.TOTAL_COUNT_HEADER],
 )
 
+# --- Métricas por requisição (duração, instruções SQL e tempo no banco) ---
+if metrics.METRICS_ENABLED:
+    # Na classe Engine: vale para todos os engines, inclusive os criados depois, sob demanda
+    metrics.instrument_engine(Engine)
+    app.add_middleware(metrics.RequestMetricsMiddleware)
+
 # --- Inclusão dos Roteadores ---
 app.include_router(auth_router.router)
 app.include_router(products_router.router)
+app.include_router(orders_router.feed_router)
 app.include_router(orders_router.router)
+app.include_router(admin_router.router)
+app.include_router(reports_router.router)
+app.include_router(health_router.router)
 
 # --- Rota raiz ---
 @app.get("/")
 def root():
     return {"message": "Bem-vindo à API da Panificadora Trigão"}
+
+# --- Métricas (formato Prometheus) ---
+# Rotas e tempos revelam o uso da API: com METRICS_TOKEN, o Prometheus se autentica com
+# esse token; sem ele, /metrics só responde a administradores (token JWT)
+async def metrics_access(token: Optional[str] = Depends(auth.optional_oauth2_scheme), db: AsyncSession = Depends(auth.get_async_db)):
+    if metrics.METRICS_TOKEN:
+        if token is None or not secrets.compare_digest(token, metrics.METRICS_TOKEN):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+        return
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    user = await auth.get_current_active_user(await auth.user_from_token(token, db))
+    auth.RoleChecker([schemas.Role.ADMIN])(user)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(metrics_access)])
+def read_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
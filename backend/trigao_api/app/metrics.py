@@ -0,0 +1,210 @@
+"""
+Métricas por requisição: duração, número de instruções SQL e tempo gasto no banco,
+agregados por rota (o template, ex.: /api/v1/orders/{order_id}) e expostos no formato
+texto do Prometheus em /metrics. Requisições lentas são registradas no log junto com
+as instruções SQL executadas.
+
+As instruções são atribuídas à requisição por uma ContextVar, propagada tanto para o
+threadpool das rotas síncronas quanto para o greenlet do AsyncSession. As métricas são
+por processo: com vários workers, o Prometheus agrega as séries de cada um.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))
+SLOW_REQUEST_MAX_STATEMENTS = 50  # Instruções listadas no log de uma requisição lenta
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # /metrics exige "Authorization: Bearer <token>"; sem ele, um administrador
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+logger = logging.getLogger(__name__)
+
+# --- Coleta por Requisição ---
+
+class RequestStats:
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.db_time = 0.0
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+# O início fica no contexto de execução da instrução, que é descartado junto com ela:
+# uma instrução que falha (sem after_cursor_execute) não deixa nada para trás na conexão
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None and context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is None:
+        return
+    started = getattr(context, "_metrics_query_start", None)
+    if started is not None:
+        stats.db_time += time.perf_counter() - started
+    stats.statements.append(statement)
+
+def instrument_engine(engine) -> None:
+    """
+    Registra os hooks de medição no engine (para AsyncEngine, passe engine.sync_engine)
+    ou na classe Engine, valendo para todos os engines do processo.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- Agregação ---
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class _RouteMetrics:
+    __slots__ = ("count", "duration", "statements", "db_time")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.statements = _Histogram(STATEMENT_BUCKETS)
+        self.db_time = 0.0
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(method: str, route: str, status: int, **extra) -> str:
+    labels = {"method": method, "route": route, "status": str(status), **extra}
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str, int], _RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, statements: int, db_time: float) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route, status))
+            if metrics is None:
+                metrics = self._routes[(method, route, status)] = _RouteMetrics()
+            metrics.count += 1
+            metrics.duration.observe(duration)
+            metrics.statements.observe(statements)
+            metrics.db_time += db_time
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Duração das requisições HTTP.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route, status), metrics in routes:
+                lines += self._histogram_lines("http_request_duration_seconds", method, route, status, metrics.duration, metrics.count)
+            lines += [
+                "# HELP db_statements_per_request Instruções SQL executadas por requisição.",
+                "# TYPE db_statements_per_request histogram",
+            ]
+            for (method, route, status), metrics in routes:
+                lines += self._histogram_lines("db_statements_per_request", method, route, status, metrics.statements, metrics.count)
+            lines += [
+                "# HELP db_time_seconds_total Tempo total gasto executando SQL.",
+                "# TYPE db_time_seconds_total counter",
+            ]
+            for (method, route, status), metrics in routes:
+                lines.append(f"db_time_seconds_total{_labels(method, route, status)} {_number(metrics.db_time)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram_lines(name: str, method: str, route: str, status: int, histogram: _Histogram, count: int) -> List[str]:
+        lines = [
+            f"{name}_bucket{_labels(method, route, status, le=_number(bound))} {bucket_count}"
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts)
+        ]
+        lines.append(f"{name}_bucket{_labels(method, route, status, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_labels(method, route, status)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(method, route, status)} {count}")
+        return lines
+
+registry = MetricsRegistry()
+
+# --- Middleware ---
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware): mede até o fim do corpo, inclusive em streaming."""
+
+    def __init__(self, app, registry: MetricsRegistry = registry, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = slow_request_ms  # None: usa SLOW_REQUEST_MS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+        streaming = False
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                streaming = any(name == b"content-type" and value.startswith(b"text/event-stream") for name, value in message.get("headers", ()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            _current_request.reset(token)
+            # O roteador grava a rota encontrada no próprio scope
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.registry.observe(scope["method"], route, status_code, duration, len(stats.statements), stats.db_time)
+            slow_request_ms = SLOW_REQUEST_MS if self.slow_request_ms is None else self.slow_request_ms
+            # Streams (ex.: feed de pedidos) ficam abertos de propósito: não são requisições lentas
+            if duration * 1000 >= slow_request_ms and not streaming:
+                self._log_slow_request(scope, route, status_code, duration, stats)
+
+    def _log_slow_request(self, scope, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+        statements = "\n".join(f"  {statement}" for statement in stats.statements[:SLOW_REQUEST_MAX_STATEMENTS])
+        omitted = len(stats.statements) - SLOW_REQUEST_MAX_STATEMENTS
+        if omitted > 0:
+            statements += f"\n  ... (+{omitted} instruções)"
+        logger.warning(
+            f"Requisição lenta: {scope['method']} {scope['path']} (rota {route}) -> {status_code} em {duration * 1000:.0f} ms; "
+            f"{len(stats.statements)} instruções SQL, {stats.db_time * 1000:.0f} ms no banco\n{statements}"
+        )
@@ -1,7 +1,7 @@
 from sqlalchemy import (Column, Integer, String, Float, Boolean, 
-                        DateTime, ForeignKey, Numeric, func)
+                        Date, DateTime, ForeignKey, Numeric, Index, CheckConstraint, func)
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from typing import List
+from typing import List, Optional
 
 from .database import Base
 
@@ -20,6 +20,10 @@ class User(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Última barreira contra venda acima do estoque (a reserva já usa UPDATE condicional)
+        CheckConstraint("stock >= 0", name="ck_products_stock_non_negative"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     code: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
@@ -28,10 +32,31 @@ class Product(Base):
     tax: Mapped[str] = mapped_column(String, nullable=True)
     section: Mapped[str] = mapped_column(String, nullable=True)
     price: Mapped[float] = mapped_column(Float, nullable=False)
+    # Versão do catálogo em que o produto foi criado ou alterado pela última vez
+    version: Mapped[int] = mapped_column(Integer, default=0, index=True, nullable=False)
+    # Estoque disponível; NULL = sem controle de estoque (venda livre)
+    stock: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Relação adicionada para vincular a OrderItem (opcional, mas bom para futuras consultas)
     order_items: Mapped[List["OrderItem"]] = relationship(back_populates="product")
 
+# --- Versionamento do Catálogo ---
+class CatalogState(Base):
+    """Linha única com a versão atual do catálogo, incrementada a cada alteração de produto."""
+    __tablename__ = "catalog_state"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+class ProductTombstone(Base):
+    """Registro de um produto removido, para a sincronização incremental do catálogo."""
+    __tablename__ = "product_tombstones"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    code: Mapped[str] = mapped_column(String, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+
 # --- NOVO MODELO: Order ---
 class Order(Base):
     __tablename__ = "orders"
@@ -46,6 +71,12 @@ class Order(Base):
     # Relação: Um pedido tem múltiplos itens
     items: Mapped[List["OrderItem"]] = relationship(back_populates="order", cascade="all, delete-orphan")
 
+# Índices de cobertura das listagens (created_at DESC, id DESC): a ordem e a paginação por
+# cursor vêm do índice, e as colunas do resumo (schemas.OrderSummary) estão nele, então as
+# páginas do histórico são lidas só do índice (index-only scan), sem tocar na tabela.
+Index("ix_orders_created_at_desc", Order.created_at.desc(), Order.id.desc(), Order.user_id, Order.total_amount)
+Index("ix_orders_user_id_created_at_desc", Order.user_id, Order.created_at.desc(), Order.id.desc(), Order.total_amount)
+
 # --- NOVO MODELO: OrderItem ---
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -53,10 +84,23 @@ class OrderItem(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     price: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False) # Preço no momento da compra
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), nullable=False)
+    section: Mapped[str] = mapped_column(String, nullable=True)  # Seção do produto no momento da compra
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), index=True, nullable=False)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
 
     # Relação: Um item de pedido pertence a um pedido
     order: Mapped["Order"] = relationship(back_populates="items")
     # Relação: Um item de pedido refere-se a um produto
-    product: Mapped["Product"] = relationship(back_populates="order_items")
\ No newline at end of file
+    product: Mapped["Product"] = relationship(back_populates="order_items")
+
+# --- Relatórios: consolidado diário de vendas ---
+class DailySales(Base):
+    """Vendas consolidadas por dia e produto, atualizadas na mesma transação do pedido."""
+    __tablename__ = "daily_sales"
+
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    section: Mapped[str] = mapped_column(String, nullable=True, index=True)  # Seção do produto na data da venda
+    quantity: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    revenue: Mapped[float] = mapped_column(Numeric(12, 2), default=0, nullable=False)
+    order_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # Pedidos distintos com o produto
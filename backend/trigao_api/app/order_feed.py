@@ -0,0 +1,235 @@
+"""
+Feed de novos pedidos para as telas da produção (server-sent events).
+
+Um único OrderFeed por worker consulta o banco e distribui cada pedido novo, já
+codificado em JSON (formato de schemas.OrderRead), a todas as telas conectadas: o custo
+de consulta e serialização não cresce com o número de telas. A consulta roda quando um
+pedido é confirmado neste worker (crud/crud_async e o group commit chamam
+notify_new_orders() após o commit) e, como rede de segurança para pedidos gravados por outros workers, a cada
+ORDER_FEED_POLL_SECONDS, só enquanto houver alguém conectado. Sem telas conectadas,
+o feed não faz nada.
+
+Os últimos ORDER_FEED_BUFFER pedidos ficam em memória: uma tela que reconecta com o
+último ID recebido (Last-Event-ID) recebe os que perdeu a partir dali, ou, se o ID já
+saiu do buffer, com uma única consulta ao banco. Se ela perdeu mais pedidos do que isso
+repõe (mais de ORDER_FEED_BUFFER), recebe um evento `resync` em vez deles: deve recarregar
+a listagem de pedidos e continuar recebendo os novos pelo feed.
+"""
+import asyncio
+import itertools
+import logging
+import os
+from collections import deque
+from typing import AsyncIterator, Deque, List, NamedTuple, Optional, Set, Tuple, Union
+
+import orjson
+
+from . import crud_async
+from .database import AsyncSessionLocal
+
+ORDER_FEED_POLL_SECONDS = float(os.getenv("ORDER_FEED_POLL_SECONDS", 2))
+ORDER_FEED_HEARTBEAT_SECONDS = float(os.getenv("ORDER_FEED_HEARTBEAT_SECONDS", 15))
+ORDER_FEED_BUFFER = int(os.getenv("ORDER_FEED_BUFFER", 500))
+# IDs revisitados a cada consulta: um pedido com ID menor pode ser confirmado depois de um
+# com ID maior (transações concorrentes no Postgres) e não pode ficar de fora do feed
+ORDER_FEED_LOOKBACK = 50
+SSE_RETRY_MS = 3000
+
+logger = logging.getLogger(__name__)
+
+class FeedEvent(NamedTuple):
+    seq: int
+    order_id: int
+    data: bytes  # JSON do pedido
+
+class Resync(NamedTuple):
+    """A tela perdeu pedidos que o feed não repõe: deve recarregar a listagem."""
+    last_id: int  # ponto de retomada do feed (maior ID já publicado)
+
+class OrderFeed:
+    def __init__(self, session_factory=AsyncSessionLocal, poll_seconds: float = ORDER_FEED_POLL_SECONDS,
+                 buffer_size: int = ORDER_FEED_BUFFER):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.buffer_size = buffer_size
+        self._subscribers = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        # Estado da sessão de publicação; recomeça quando a última tela desconecta
+        self._events: Deque[FeedEvent] = deque(maxlen=self.buffer_size)
+        self._published: Set[int] = set()  # IDs já publicados dentro de ORDER_FEED_LOOKBACK
+        self._next_seq = 0
+        self._floor: Optional[int] = None  # maior ID existente quando o feed começou
+        self._cursor: Optional[int] = None  # maior ID já publicado (ou o piso)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._new_events: Optional[asyncio.Event] = None
+
+    # --- Publicação ---
+
+    def notify(self) -> None:
+        """Pede uma consulta imediata. Pode ser chamado de qualquer thread (rotas síncronas)."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return  # Ninguém conectado
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:  # Event loop já encerrado
+            pass
+
+    def _start(self) -> None:
+        if self._poller is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._new_events = asyncio.Event()
+        self._poller = self._loop.create_task(self._run())
+
+    def _stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        self._reset()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception("Falha ao consultar novos pedidos para o feed")
+            self._ready.set()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _poll(self) -> None:
+        async with self.session_factory() as db:
+            if self._cursor is None:
+                self._floor = self._cursor = await crud_async.get_latest_order_id(db)
+                return
+            # Quase sempre uma consulta só de IDs, que não retorna nada de novo
+            after, new_ids = max(self._floor, self._cursor - ORDER_FEED_LOOKBACK), []
+            while True:
+                ids = await crud_async.get_order_ids_after(db, after, self.buffer_size)
+                new_ids += [order_id for order_id in ids if order_id not in self._published]
+                if len(ids) < self.buffer_size:
+                    break
+                after = ids[-1]
+            if not new_ids:
+                return
+            rows = await crud_async.get_order_rows_by_ids(db, new_ids)
+        for row in rows:
+            self._publish(row["id"], orjson.dumps(row))
+        # Só os IDs da janela revisitada precisam ser lembrados
+        self._published = {order_id for order_id in self._published if order_id > self._cursor - ORDER_FEED_LOOKBACK}
+        # Acorda todas as telas de uma vez; a próxima espera usa um Event novo
+        self._new_events.set()
+        self._new_events = asyncio.Event()
+
+    def _publish(self, order_id: int, data: bytes) -> None:
+        self._events.append(FeedEvent(self._next_seq, order_id, data))
+        self._next_seq += 1
+        self._published.add(order_id)
+        self._cursor = max(self._cursor, order_id)
+
+    def _events_since(self, seq: int) -> Optional[List[FeedEvent]]:
+        """Eventos a partir de `seq`, ou None se algum já saiu do buffer (tela lenta demais)."""
+        if not self._events:
+            return []
+        start = seq - self._events[0].seq
+        if start < 0:
+            return None
+        return list(itertools.islice(self._events, start, None))
+
+    # --- Assinatura ---
+
+    async def _backlog(self, last_id: int) -> Optional[List[Tuple[int, bytes]]]:
+        """Pedidos posteriores a `last_id` que a tela ainda não recebeu; None se passarem de buffer_size."""
+        for position, event in enumerate(self._events):
+            if event.order_id == last_id:
+                return [(e.order_id, e.data) for e in itertools.islice(self._events, position + 1, None)]
+        if self._cursor is not None and last_id >= self._cursor:
+            return []
+        async with self.session_factory() as db:
+            rows = await crud_async.get_order_rows_after(db, last_id, self.buffer_size + 1)
+        if len(rows) > self.buffer_size:
+            return None
+        return [(row["id"], orjson.dumps(row)) for row in rows]
+
+    async def subscribe(self, last_id: Optional[int] = None,
+                        heartbeat_seconds: float = ORDER_FEED_HEARTBEAT_SECONDS) -> AsyncIterator[Union[Tuple[int, bytes], Resync, None]]:
+        """
+        Gera (ID, JSON) de cada pedido novo. Com `last_id`, começa pelos posteriores a ele.
+        Gera Resync quando a tela perdeu pedidos que o feed não repõe, e None a cada
+        `heartbeat_seconds` sem pedidos, para manter a conexão viva.
+        """
+        self._subscribers += 1
+        self._start()
+        try:
+            await self._ready.wait()
+            seq = self._next_seq
+            sent: Set[int] = set()
+            if last_id is not None:
+                backlog = await self._backlog(last_id)
+                if backlog is None:
+                    yield Resync(self._cursor if self._cursor is not None else last_id)
+                    backlog = []
+                for order_id, data in backlog:
+                    sent.add(order_id)
+                    yield order_id, data
+            while True:
+                events = self._events_since(seq)
+                if events is None:
+                    # Tela lenta demais: eventos já saíram do buffer
+                    seq = self._next_seq
+                    yield Resync(self._cursor)
+                    continue
+                if not events:
+                    try:
+                        await asyncio.wait_for(self._new_events.wait(), heartbeat_seconds)
+                    except asyncio.TimeoutError:
+                        yield None
+                    continue
+                seq = events[-1].seq + 1
+                for event in events:
+                    # Um pedido do backlog lido do banco pode ser publicado ao vivo logo depois
+                    if event.order_id not in sent:
+                        yield event.order_id, event.data
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0:
+                self._stop()
+
+async def sse_stream(feed: OrderFeed, last_id: Optional[int] = None,
+                     heartbeat_seconds: float = ORDER_FEED_HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+    """Formata o feed como text/event-stream: `id` é o ID do pedido e `data`, o pedido em JSON."""
+    yield b"retry: %d\n\n" % SSE_RETRY_MS
+    async for event in feed.subscribe(last_id, heartbeat_seconds):
+        if event is None:
+            yield b": keepalive\n\n"
+        elif isinstance(event, Resync):
+            # O `id` leva o Last-Event-ID da próxima reconexão para depois do que a tela recarregou
+            yield b"id: %d\nevent: resync\ndata: {\"last_id\": %d}\n\n" % (event.last_id, event.last_id)
+        else:
+            order_id, data = event
+            yield b"id: %d\nevent: order\ndata: %s\n\n" % (order_id, data)
+
+_feed: Optional[OrderFeed] = None
+
+def get_order_feed() -> OrderFeed:
+    """Dependência das rotas: o feed do worker."""
+    global _feed
+    if _feed is None:
+        _feed = OrderFeed()
+    return _feed
+
+def notify_new_orders() -> None:
+    """Chamado após o commit de pedidos novos: acorda o feed, se houver telas conectadas."""
+    if _feed is not None:
+        _feed.notify()
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+from typing import Mapping, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+
+# Cabeçalho com o cursor da próxima página (paginação por chave/keyset)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Maior página aceita em `limit` pelas rotas de listagem
+MAX_PAGE_SIZE = 1000
+
+# IDs cabem em um inteiro de 64 bits com sinal: fora disso o driver do banco falha (500)
+MAX_CURSOR_ID = 2 ** 63 - 1
+
+def encode_cursor(last_id: int) -> str:
+    """Gera um cursor opaco apontando para o último registro retornado."""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Extrai o ID do último registro de um cursor. Lança ValueError se for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["id"]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, KeyError) as e:
+        raise ValueError("Cursor inválido") from e
+    if not isinstance(last_id, int) or isinstance(last_id, bool) or not -MAX_CURSOR_ID - 1 <= last_id <= MAX_CURSOR_ID:
+        raise ValueError("Cursor inválido")
+    return last_id
+
+def resolve_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Converte o cursor recebido por um router, respondendo 400 se for inválido."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int) -> None:
+    """Adiciona o cursor da próxima página quando a página atual veio cheia (linhas ORM ou dicionários)."""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["id"] if isinstance(last, Mapping) else last.id)
@@ -0,0 +1,160 @@
+"""
+Consolidado diário de vendas (tabela daily_sales): atualizado na mesma transação de
+cada pedido e lido pelos relatórios, que assim não dependem do volume de pedidos.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, distinct, func, insert, select
+from sqlalchemy.orm import Session, aliased
+
+from . import crud, models
+from .database import upsert_insert
+
+# --- Atualização Incremental ---
+
+def daily_sales_upsert(db, orders: Iterable[models.Order], products: Dict[int, models.Product]):
+    """
+    Monta o upsert que soma os pedidos ao consolidado do dia corrente (data do banco,
+    a mesma usada em Order.created_at). Retorna None se não houver itens.
+    Serve para sessões síncronas e assíncronas: quem chama executa antes do commit.
+    """
+    totals: Dict[int, dict] = {}
+    for order in orders:
+        products_in_order = set()
+        for item in order.items:
+            row = totals.setdefault(item.product_id, {"quantity": 0, "revenue": 0.0, "order_count": 0})
+            row["quantity"] += item.quantity
+            row["revenue"] += item.price * item.quantity
+            if item.product_id not in products_in_order:
+                products_in_order.add(item.product_id)
+                row["order_count"] += 1
+    if not totals:
+        return None
+
+    # Linhas em ordem de produto: transações concorrentes bloqueiam as linhas na mesma ordem
+    stmt = upsert_insert(db)(models.DailySales).values([
+        {
+            "day": func.current_date(),
+            "product_id": product_id,
+            "section": products[product_id].section,
+            "quantity": row["quantity"],
+            "revenue": round(row["revenue"], 2),
+            "order_count": row["order_count"],
+        }
+        for product_id, row in sorted(totals.items())
+    ])
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[models.DailySales.day, models.DailySales.product_id],
+        set_={
+            "quantity": models.DailySales.quantity + excluded.quantity,
+            "revenue": models.DailySales.revenue + excluded.revenue,
+            "order_count": models.DailySales.order_count + excluded.order_count,
+        },
+    )
+
+def record_daily_sales(db: Session, orders: Iterable[models.Order], products: Dict[int, models.Product]) -> None:
+    stmt = daily_sales_upsert(db, orders, products)
+    if stmt is not None:
+        db.execute(stmt)
+
+# --- Reconstrução ---
+
+def rebuild_daily_sales(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """
+    Recalcula o consolidado a partir dos pedidos (todo o histórico ou o intervalo de
+    datas informado, inclusivo) com um único INSERT ... SELECT. Retorna o número de linhas.
+    Deve rodar fora do horário de pedidos: pedidos criados durante a reconstrução do
+    mesmo dia podem ser contados duas vezes.
+    A seção é a gravada no primeiro item do dia de cada produto, como no consolidado
+    incremental (o upsert não troca a seção da linha do dia); itens gravados antes da
+    coluna order_items.section usam a seção atual do produto.
+    """
+    clear = delete(models.DailySales)
+    if start is not None:
+        clear = clear.where(models.DailySales.day >= start)
+    if end is not None:
+        clear = clear.where(models.DailySales.day <= end)
+    db.execute(clear)
+
+    day = func.date(models.Order.created_at)
+    totals = (
+        select(
+            day.label("day"),
+            models.OrderItem.product_id,
+            func.sum(models.OrderItem.quantity).label("quantity"),
+            func.sum(models.OrderItem.quantity * models.OrderItem.price).label("revenue"),
+            func.count(distinct(models.Order.id)).label("order_count"),
+            func.min(models.OrderItem.id).label("first_item_id"),
+        )
+        .join(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .where(*crud.orders_created_between(start, end))
+        .group_by(day, models.OrderItem.product_id)
+        .subquery()
+    )
+    first_item = aliased(models.OrderItem)
+    aggregated = (
+        select(
+            totals.c.day,
+            totals.c.product_id,
+            func.coalesce(first_item.section, models.Product.section),
+            totals.c.quantity,
+            totals.c.revenue,
+            totals.c.order_count,
+        )
+        .join(first_item, first_item.id == totals.c.first_item_id)
+        .join(models.Product, models.Product.id == totals.c.product_id)
+    )
+    result = db.execute(
+        insert(models.DailySales).from_select(
+            ["day", "product_id", "section", "quantity", "revenue", "order_count"], aggregated
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+# --- Consultas (somente sobre daily_sales) ---
+
+def _in_period(query, start: Optional[date], end: Optional[date]):
+    if start is not None:
+        query = query.where(models.DailySales.day >= start)
+    if end is not None:
+        query = query.where(models.DailySales.day <= end)
+    return query
+
+def get_sales_by_day(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+    query = select(
+        models.DailySales.day,
+        func.sum(models.DailySales.quantity).label("quantity"),
+        func.sum(models.DailySales.revenue).label("revenue"),
+    ).group_by(models.DailySales.day).order_by(models.DailySales.day)
+    return [row._asdict() for row in db.execute(_in_period(query, start, end))]
+
+def get_sales_by_section(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+    query = select(
+        models.DailySales.section,
+        func.sum(models.DailySales.quantity).label("quantity"),
+        func.sum(models.DailySales.revenue).label("revenue"),
+    ).group_by(models.DailySales.section).order_by(func.sum(models.DailySales.revenue).desc())
+    return [row._asdict() for row in db.execute(_in_period(query, start, end))]
+
+def get_sales_by_product(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                         section: Optional[str] = None, limit: int = 50) -> List[dict]:
+    """Produtos mais vendidos no período (por faturamento). O nome vem do catálogo, pela chave primária."""
+    totals = select(
+        models.DailySales.product_id,
+        func.sum(models.DailySales.quantity).label("quantity"),
+        func.sum(models.DailySales.revenue).label("revenue"),
+        func.sum(models.DailySales.order_count).label("order_count"),
+    ).group_by(models.DailySales.product_id)
+    if section is not None:
+        totals = totals.where(models.DailySales.section == section)
+    totals = _in_period(totals, start, end).order_by(func.sum(models.DailySales.revenue).desc()).limit(limit).subquery()
+
+    query = (
+        select(totals, models.Product.product_name, models.Product.section)
+        .join(models.Product, models.Product.id == totals.c.product_id)
+        .order_by(totals.c.revenue.desc())
+    )
+    return [row._asdict() for row in db.execute(query)]
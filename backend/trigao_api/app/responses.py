@@ -0,0 +1,15 @@
+"""
+Resposta JSON codificada com orjson, para as listagens que montam os dicionários direto
+das colunas (crud_async.get_product_rows, get_order_rows): sem response_model a validar,
+o FastAPI usaria o json da biblioteca padrão. As demais rotas usam a serialização do
+próprio FastAPI (Pydantic, a partir do response_model).
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+class ORJSONResponse(JSONResponse):
+    # Substitui fastapi.responses.ORJSONResponse, obsoleta
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
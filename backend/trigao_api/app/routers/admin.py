@@ -0,0 +1,74 @@
+import io
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from .. import schemas, auth
+from ..catalog_import import import_catalog
+from ..export import iter_orders_csv, iter_orders_ndjson
+from ..database import get_async_engine, get_async_read_engine, get_engine, get_read_engine, pool_config, pool_status, read_replica_configured
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+    dependencies=[Depends(auth.RoleChecker([schemas.Role.ADMIN]))] # Apenas administradores
+)
+
+@router.get("/db-pool", response_model=schemas.DatabasePoolsStatus)
+def read_db_pool_status():
+    """
+    Estado dos pools de conexão deste worker: conexões em uso, overflow e tempo de
+    espera por conexão, para dimensionar o pool conforme o número de workers.
+    """
+    pools = {
+        "config": pool_config(),
+        "sync_pool": pool_status(get_engine()),
+        "async_pool": pool_status(get_async_engine().sync_engine),
+    }
+    if read_replica_configured():
+        pools["read_sync_pool"] = pool_status(get_read_engine())
+        pools["read_async_pool"] = pool_status(get_async_read_engine().sync_engine)
+    return pools
+
+
+@router.post("/catalog/import", response_model=schemas.CatalogImportResult)
+def import_catalog_file(file: UploadFile = File(...), db: Session = Depends(auth.get_db)):
+    """
+    Recarrega o catálogo a partir do arquivo JSON do fornecedor (mesmo formato de
+    produtos-trigao.json). Produtos novos são criados e preços alterados são atualizados.
+    Produtos inativos ou inválidos (sem código, nome ou unidade) são pulados e contados em `skipped`.
+    """
+    try:
+        return import_catalog(db, io.TextIOWrapper(file.file, encoding="utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_orders_csv, "text/csv; charset=utf-8"),
+    "ndjson": (iter_orders_ndjson, "application/x-ndjson"),
+}
+
+@router.get("/orders/export")
+def export_orders(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(auth.get_db),
+):
+    """
+    Exporta os pedidos com itens e produtos (CSV: uma linha por item; NDJSON: um
+    pedido por linha), opcionalmente entre as datas `start` e `end` (inclusivas).
+    A resposta é enviada em blocos, sem montar o histórico inteiro em memória.
+    """
+    iter_rows, media_type = EXPORT_FORMATS[export_format]
+    filename = f"pedidos.{export_format}"
+    return StreamingResponse(
+        iter_rows(db, start=start, end=end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
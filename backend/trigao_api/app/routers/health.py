@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import auth, models
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"],
+)
+
+@router.get("/live")
+def liveness():
+    """O processo está de pé (não consulta o banco)."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness(db: AsyncSession = Depends(auth.get_async_db)):
+    """
+    O worker pode receber tráfego: o banco responde e o schema foi criado
+    (python init_db.py). Caso contrário, 503.
+    """
+    try:
+        await db.execute(select(models.CatalogState.id).limit(1))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Banco de dados indisponível ou schema não criado (execute python init_db.py).",
+        )
+    return {"status": "ready"}
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from .. import crud, models, schemas, auth
+from .. import crud, crud_async, models, schemas, auth
+from ..pagination import MAX_PAGE_SIZE, resolve_cursor, set_next_cursor
+from ..responses import ORJSONResponse
+from ..group_commit import OrderGroupCommitter, get_order_committer
+from ..order_feed import OrderFeed, get_order_feed, sse_stream
 
 router = APIRouter(
     prefix="/api/v1/orders",
@@ -10,46 +16,99 @@ router = APIRouter(
     dependencies=[Depends(auth.get_current_active_user)] # Protege todas as rotas deste router
 )
 
+# Streams: autenticação própria (auth.StreamRoleChecker), com token no cabeçalho ou na URL.
+# Incluído antes de `router`, para /feed não cair em /{order_id}.
+feed_router = APIRouter(prefix="/api/v1/orders", tags=["Orders"])
+
 @router.post("/", response_model=schemas.OrderRead, status_code=status.HTTP_201_CREATED)
-def create_new_order(
+async def create_new_order(
     order_in: schemas.OrderCreate,
-    db: Session = Depends(auth.get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(auth.get_async_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    committer: Optional[OrderGroupCommitter] = Depends(get_order_committer),
 ):
     """
     Cria um novo pedido para o usuário atualmente logado.
     Acessível por qualquer usuário autenticado.
+    Com ORDER_GROUP_COMMIT ligado, pedidos simultâneos são gravados juntos (group commit).
+    Responde 409 se faltar estoque de algum produto (nada é gravado).
     """
     try:
-        return crud.create_order(db=db, order_in=order_in, user_id=current_user.id)
+        if committer is not None:
+            order = await committer.submit(order_in, user_id=current_user.id)
+        else:
+            order = await crud_async.create_order(db=db, order_in=order_in, user_id=current_user.id)
+    except crud.InsufficientStockError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         # Captura o erro de produto não encontrado do CRUD e retorna um 404
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    auth.mark_recent_write(current_user.id)
+    return order
 
 
-@router.get("/", response_model=List[schemas.OrderRead])
-def list_orders(
-    skip: int = 0,
-    limit: int = 100,
+@router.post("/batch", response_model=schemas.OrderBatchResponse)
+def create_orders_batch(
+    batch_in: schemas.OrderBatchCreate,
     db: Session = Depends(auth.get_db),
+    current_user: models.User = Depends(auth.RoleChecker([schemas.Role.ADMIN]))
+):
+    """
+    Cria vários pedidos de uma vez (atacado / aplicativo de entregas), em uma única
+    transação. Acessível apenas por administradores.
+    Cada pedido do lote tem seu próprio resultado: um produto inexistente falha
+    somente o pedido em que aparece.
+    """
+    results = crud.create_orders_batch(db, orders_in=batch_in.orders, default_user_id=current_user.id)
+    for order_in, result in zip(batch_in.orders, results):
+        if result.success:
+            auth.mark_recent_write(order_in.user_id or current_user.id)
+    created = sum(result.success for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+@router.get("/", response_model=Union[List[schemas.OrderSummary], List[schemas.OrderRead]])
+async def list_orders(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: schemas.OrderListView = schemas.OrderListView.FULL,
+    db: AsyncSession = Depends(auth.get_async_read_db),
+    primary_db: AsyncSession = Depends(auth.get_async_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
     Lista os pedidos.
     - Admins: Veem todos os pedidos.
     - Users: Veem apenas os seus próprios pedidos.
+    Paginação: o cabeçalho X-Next-Cursor traz o cursor da próxima página, que
+    pode ser enviado em `cursor` no lugar de `skip`. Um cursor de pedido que não existe
+    (removido) responde 400.
+    Por padrão cada pedido vem no formato de schemas.OrderRead, com itens e produtos.
+    Com `view=summary` (histórico de pedidos), vem resumido em schemas.OrderSummary:
+    totais e quantidade de itens, lidos só dos índices.
+    Os pedidos são montados direto das colunas (sem ORM/Pydantic).
     """
-    if current_user.role == schemas.Role.ADMIN.value:
-        orders = crud.get_all_orders(db, skip=skip, limit=limit)
-    else:
-        orders = crud.get_orders_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-    return orders
+    after_id = resolve_cursor(cursor)
+    user_id = None if current_user.role == schemas.Role.ADMIN.value else current_user.id
+    get_rows = crud_async.get_order_rows if view == schemas.OrderListView.FULL else crud_async.get_order_summary_rows
+    orders = await get_rows(db, user_id=user_id, skip=skip, limit=limit, after_id=after_id)
+    # A posição do cursor é lida do pedido de referência: sem ele, a página viria vazia
+    if not orders and after_id is not None and not await crud_async.order_exists(db, after_id):
+        if db.bind is primary_db.bind or not await crud_async.order_exists(primary_db, after_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido: o pedido de referência não existe.")
+        # O pedido ainda não chegou à réplica
+        orders = await get_rows(primary_db, user_id=user_id, skip=skip, limit=limit, after_id=after_id)
+    response = ORJSONResponse(orders)
+    set_next_cursor(response, orders, limit)
+    return response
 
 
 @router.get("/{order_id}", response_model=schemas.OrderRead)
-def get_single_order(
+async def get_single_order(
     order_id: int,
-    db: Session = Depends(auth.get_db),
+    db: AsyncSession = Depends(auth.get_async_read_db),
+    primary_db: AsyncSession = Depends(auth.get_async_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     """
@@ -57,12 +116,41 @@ def get_single_order(
     - Admins: Podem ver qualquer pedido.
     - Users: Podem ver apenas os seus próprios pedidos.
     """
-    order = crud.get_order_by_id(db, order_id=order_id)
-    
+    order = await crud_async.get_order_by_id(db, order_id=order_id)
+    if order is None and db.bind is not primary_db.bind:
+        # O pedido pode ainda não ter chegado à réplica (ex.: criado em outro worker)
+        order = await crud_async.get_order_by_id(primary_db, order_id=order_id)
+
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido não encontrado")
 
     if current_user.role != schemas.Role.ADMIN.value and order.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Permissão insuficiente")
         
-    return order
\ No newline at end of file
+    return order
+
+
+@feed_router.get("/feed")
+async def stream_new_orders(
+    last_id: Optional[int] = None,
+    last_event_id: Optional[int] = Header(default=None),
+    db: AsyncSession = Depends(auth.get_async_db),
+    current_user: models.User = Depends(auth.StreamRoleChecker([schemas.Role.ADMIN])),
+    feed: OrderFeed = Depends(get_order_feed),
+):
+    """
+    Feed de novos pedidos (server-sent events) para as telas da produção: cada pedido,
+    no formato de schemas.OrderRead, é enviado assim que é confirmado. Na reconexão, o
+    navegador envia Last-Event-ID e recebe os pedidos perdidos (ou use `last_id`). Se
+    faltarem mais pedidos do que o feed repõe, vem um evento `resync`: a tela recarrega a
+    listagem e segue recebendo os novos.
+    Acessível apenas por administradores. Como o EventSource não envia cabeçalhos, o
+    token pode ir em `access_token` (ex.: /api/v1/orders/feed?access_token=...).
+    """
+    # A conexão usada na autenticação volta ao pool: o stream pode durar horas
+    await db.close()
+    return StreamingResponse(
+        sse_stream(feed, last_event_id if last_event_id is not None else last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
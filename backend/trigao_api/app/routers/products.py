@@ -1,31 +1,133 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from .. import crud, schemas, auth
+from .. import crud, crud_async, schemas, auth
+from ..search import get_product_search_index
+from ..catalog_snapshot import get_catalog_snapshot, choose_encoding
+from ..pagination import MAX_PAGE_SIZE, resolve_cursor, set_next_cursor
+from ..responses import ORJSONResponse
 
 router = APIRouter(
     prefix="/api/v1/products",
     tags=["Products"],
 )
 
+# --- Cache HTTP do catálogo (ETag / If-None-Match) ---
+CATALOG_VERSION_HEADER = "X-Catalog-Version"
+
+def catalog_etag(version: int) -> str:
+    return f'W/"catalog-{version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match recebido com a ETag atual (comparação fraca, aceita listas e '*')."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+def set_catalog_headers(response: Response, version: int) -> None:
+    response.headers["ETag"] = catalog_etag(version)
+    response.headers[CATALOG_VERSION_HEADER] = str(version)
+    # Resposta autenticada: só o navegador pode guardar, sempre revalidando
+    response.headers["Cache-Control"] = "private, no-cache"
+
 @router.get("/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
-    products = crud.get_products(db, skip=skip, limit=limit)
-    return products
+async def read_products(request: Request, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None, db: AsyncSession = Depends(auth.get_async_read_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
+    """
+    Lista os produtos. Quando a página vem cheia, o cabeçalho X-Next-Cursor traz o
+    cursor da próxima página; enviado em `cursor`, ele substitui o `skip` (keyset).
+    A resposta traz a ETag da versão do catálogo: com If-None-Match igual, retorna 304.
+    As linhas são codificadas direto das colunas (sem ORM/Pydantic), no formato de schemas.Product.
+    """
+    version = await crud_async.get_catalog_version(db)
+    if etag_matches(request.headers.get("If-None-Match"), catalog_etag(version)):
+        not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        set_catalog_headers(not_modified, version)
+        return not_modified
+
+    products = await crud_async.get_product_rows(db, skip=skip, limit=limit, after_id=resolve_cursor(cursor))
+    response = ORJSONResponse(products)
+    set_catalog_headers(response, version)
+    set_next_cursor(response, products, limit)
+    return response
+
+@router.get("/catalog", response_model=List[schemas.Product])
+async def read_catalog(request: Request, db: AsyncSession = Depends(auth.get_async_read_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
+    """
+    Catálogo completo (ordenado por ID), servido de um snapshot em memória já
+    codificado e comprimido conforme o Accept-Encoding (br, gzip ou sem compressão).
+    O snapshot é refeito quando a versão do catálogo muda; com If-None-Match igual à ETag, retorna 304.
+    """
+    snapshot = await get_catalog_snapshot(db)
+    if etag_matches(request.headers.get("If-None-Match"), catalog_etag(snapshot.version)):
+        not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        set_catalog_headers(not_modified, snapshot.version)
+        return not_modified
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"), snapshot.bodies)
+    response = Response(content=snapshot.bodies[encoding], media_type="application/json")
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    set_catalog_headers(response, snapshot.version)
+    return response
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+@router.get("/search", response_model=List[schemas.Product])
+async def search_products(response: Response, q: Optional[str] = None, section: Optional[str] = None, skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(auth.get_async_read_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
+    """
+    Busca produtos pelo nome (prefixo ou trecho, ignorando acentos e caixa) e/ou pela
+    seção. Os resultados vêm ordenados por relevância: nome exato, início do nome,
+    início de uma palavra e, por fim, trecho. O total fica no cabeçalho X-Total-Count.
+    """
+    index = await get_product_search_index(db)
+    results = index.search(q, section=section)
+    response.headers[TOTAL_COUNT_HEADER] = str(len(results))
+    return results[skip:skip + limit]
+
+@router.get("/changes", response_model=schemas.CatalogChanges)
+def read_catalog_changes(since: int, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
+    """
+    Sincronização incremental: retorna os produtos criados/alterados e os IDs
+    removidos depois da versão `since` (valor de X-Catalog-Version ou de uma
+    resposta anterior deste endpoint), junto com a versão atual do catálogo.
+    """
+    return crud.get_catalog_changes(db, since=since)
+
+@router.get("/stock", response_model=List[schemas.ProductStock])
+def read_stock_levels(db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.get_current_active_user)):
+    """
+    Estoque atual dos produtos com controle de estoque. Fica fora do catálogo (que é
+    cacheado pela versão) porque muda a cada pedido; lido sempre do banco principal.
+    """
+    return crud.get_stock_levels(db)
+
+@router.put("/{product_id}/stock", response_model=schemas.ProductStock)
+def update_product_stock(product_id: int, stock_in: schemas.StockUpdate, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.RoleChecker([schemas.Role.ADMIN]))):
+    """Define o estoque de um produto (null desliga o controle de estoque)."""
+    db_product = crud.set_product_stock(db, product_id=product_id, stock=stock_in.stock)
+    if db_product is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return db_product
 
 @router.post("/", response_model=schemas.Product, status_code=201)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.RoleChecker([schemas.Role.ADMIN]))):
     db_product = crud.get_product_by_code(db, code=product.code)
     if db_product:
         raise HTTPException(status_code=400, detail="Código de produto já existe")
-    return crud.create_product(db=db, product=product)
+    db_product = crud.create_product(db=db, product=product)
+    auth.mark_recent_write(current_user.id)
+    return db_product
 
 @router.put("/{product_id}", response_model=schemas.Product)
 def update_product(product_id: int, product: schemas.ProductCreate, db: Session = Depends(auth.get_db), current_user: schemas.User = Depends(auth.RoleChecker([schemas.Role.ADMIN]))):
     db_product = crud.update_product(db, product_id=product_id, product_update=product)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    auth.mark_recent_write(current_user.id)
     return db_product
 
 @router.delete("/{product_id}", response_model=schemas.Product)
@@ -33,4 +135,5 @@ def delete_product(product_id: int, db: Session = Depends(auth.get_db), current_
     db_product = crud.delete_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    auth.mark_recent_write(current_user.id)
     return db_product
\ No newline at end of file
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import reports, schemas, auth
+from ..pagination import MAX_PAGE_SIZE
+
+router = APIRouter(
+    prefix="/api/v1/reports",
+    tags=["Reports"],
+    dependencies=[Depends(auth.RoleChecker([schemas.Role.ADMIN]))] # Apenas administradores
+)
+
+DEFAULT_PERIOD_DAYS = 30
+
+def period(start: Optional[date] = None, end: Optional[date] = None):
+    """Período do relatório (inclusivo). Padrão: os últimos 30 dias."""
+    end = end or date.today()
+    start = start or end - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+    return start, end
+
+# Todos os relatórios leem apenas o consolidado diário (daily_sales), nunca os pedidos,
+# e da réplica de leitura quando configurada (DATABASE_READ_URL)
+
+@router.get("/sales/daily", response_model=List[schemas.DailySalesSummary])
+def read_sales_by_day(dates: tuple = Depends(period), db: Session = Depends(auth.get_read_db)):
+    """Quantidade vendida e faturamento por dia."""
+    return reports.get_sales_by_day(db, *dates)
+
+@router.get("/sales/sections", response_model=List[schemas.SectionSalesSummary])
+def read_sales_by_section(dates: tuple = Depends(period), db: Session = Depends(auth.get_read_db)):
+    """Quantidade vendida e faturamento por seção no período."""
+    return reports.get_sales_by_section(db, *dates)
+
+@router.get("/sales/products", response_model=List[schemas.ProductSalesSummary])
+def read_sales_by_product(section: Optional[str] = None, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), dates: tuple = Depends(period), db: Session = Depends(auth.get_read_db)):
+    """Produtos mais vendidos no período, por faturamento, com a quantidade de pedidos."""
+    return reports.get_sales_by_product(db, *dates, section=section, limit=limit)
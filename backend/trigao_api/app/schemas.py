@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
 from typing import Optional, List
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
 
 class Role(str, Enum):
     ADMIN = "admin"
@@ -18,7 +18,7 @@ class ProductRead(BaseModel):
 # --- Schemas de Item de Pedido ---
 class OrderItemBase(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
 
 class OrderItemCreate(OrderItemBase):
     pass
@@ -44,6 +44,40 @@ class OrderRead(OrderBase):
     items: List[OrderItemRead] = []
     model_config = ConfigDict(from_attributes=True)
 
+class OrderSummary(BaseModel):
+    """Pedido sem os itens, para listagens (histórico de pedidos): só totais e quantidade de itens."""
+    id: int
+    user_id: int
+    total_amount: float
+    created_at: datetime
+    item_count: int
+    model_config = ConfigDict(from_attributes=True)
+
+class OrderListView(str, Enum):
+    SUMMARY = "summary"  # schemas.OrderSummary
+    FULL = "full"  # schemas.OrderRead, com itens e produtos
+
+# --- Schemas de Pedidos em Lote ---
+MAX_BATCH_ORDERS = 500
+
+class BatchOrderCreate(OrderCreate):
+    user_id: Optional[int] = None  # Padrão: o administrador que envia o lote
+
+class OrderBatchCreate(BaseModel):
+    orders: List[BatchOrderCreate] = Field(..., min_length=1, max_length=MAX_BATCH_ORDERS)
+
+class OrderBatchResult(BaseModel):
+    index: int  # Posição do pedido no lote enviado
+    success: bool
+    order_id: Optional[int] = None
+    total_amount: Optional[float] = None
+    error: Optional[str] = None
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
+
 # --- Schemas de Produto ---
 class ProductBase(BaseModel):
     code: str
@@ -60,6 +94,29 @@ class Product(ProductBase):
     id: int
     model_config = ConfigDict(from_attributes=True)
 
+class ProductStock(BaseModel):
+    """Estoque de um produto (None = sem controle de estoque). Fora do catálogo, que é cacheado."""
+    id: int
+    stock: Optional[int] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class StockUpdate(BaseModel):
+    stock: Optional[int] = Field(None, ge=0)
+
+class CatalogChanges(BaseModel):
+    """Alterações do catálogo desde uma versão conhecida pelo cliente."""
+    version: int
+    updated: List[Product] = []
+    deleted_ids: List[int] = []
+
+class CatalogImportResult(BaseModel):
+    """Resumo de uma importação do arquivo de produtos do fornecedor."""
+    read: int
+    skipped: int
+    unique: int
+    written: int
+    version: int
+
 # --- Schemas de Usuário ---
 class UserBase(BaseModel):
     email: EmailStr
@@ -81,4 +138,50 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
-    role: Optional[Role] = None
\ No newline at end of file
+    role: Optional[Role] = None
+
+# --- Schemas de Relatórios ---
+class DailySalesSummary(BaseModel):
+    day: date
+    quantity: int
+    revenue: float
+
+class SectionSalesSummary(BaseModel):
+    section: Optional[str] = None
+    quantity: int
+    revenue: float
+
+class ProductSalesSummary(BaseModel):
+    product_id: int
+    product_name: str
+    section: Optional[str] = None
+    quantity: int
+    revenue: float
+    order_count: int
+
+# --- Schemas de Administração ---
+class PoolConfig(BaseModel):
+    pool_size: int
+    max_overflow: int
+    timeout: float
+    recycle: int
+    pre_ping: bool
+
+class PoolStatus(BaseModel):
+    pool_class: str
+    pool_size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    waits: Optional[int] = None
+    total_wait_seconds: Optional[float] = None
+    max_wait_seconds: Optional[float] = None
+    timeouts: Optional[int] = None
+
+class DatabasePoolsStatus(BaseModel):
+    config: PoolConfig
+    sync_pool: PoolStatus
+    async_pool: PoolStatus
+    read_sync_pool: Optional[PoolStatus] = None  # Só com réplica de leitura (DATABASE_READ_URL)
+    read_async_pool: Optional[PoolStatus] = None
\ No newline at end of file
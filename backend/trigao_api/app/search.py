@@ -0,0 +1,105 @@
+"""
+Busca de produtos por nome (prefixo e trecho, sem diferenciar acentos e caixa) e por
+seção, servida por um índice em memória. O índice é reconstruído quando a versão do
+catálogo muda, então cada worker enxerga as alterações feitas por qualquer outro.
+"""
+import bisect
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud_async, models, schemas
+
+# Posição no ranking (menor = mais relevante)
+RANK_EXACT, RANK_NAME_PREFIX, RANK_WORD_PREFIX, RANK_SUBSTRING = range(4)
+
+def normalize(text: Optional[str]) -> str:
+    """Remove acentos e normaliza a caixa: 'Pão de Açúcar' -> 'PAO DE ACUCAR'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).upper().strip()
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class ProductSearchIndex:
+    def __init__(self, products: Iterable[schemas.Product]):
+        self.products: Dict[int, schemas.Product] = {}
+        self.names: Dict[int, str] = {}
+        self.by_section: Dict[Optional[str], Set[int]] = defaultdict(set)
+        self.by_trigram: Dict[str, Set[int]] = defaultdict(set)
+        sorted_names: List[Tuple[str, int]] = []
+
+        for product in products:
+            name = normalize(product.product_name)
+            self.products[product.id] = product
+            self.names[product.id] = name
+            self.by_section[product.section].add(product.id)
+            for trigram in trigrams(name):
+                self.by_trigram[trigram].add(product.id)
+            sorted_names.append((name, product.id))
+
+        sorted_names.sort()
+        self._sorted_names = sorted_names
+        self._sorted_keys = [name for name, _ in sorted_names]
+
+    def _prefix_ids(self, query: str) -> List[int]:
+        start = bisect.bisect_left(self._sorted_keys, query)
+        ids = []
+        for name, product_id in self._sorted_names[start:]:
+            if not name.startswith(query):
+                break
+            ids.append(product_id)
+        return ids
+
+    def _substring_candidates(self, query: str) -> Iterable[int]:
+        if len(query) < 3:
+            return self.names.keys()
+        postings = sorted((self.by_trigram.get(trigram, set()) for trigram in trigrams(query)), key=len)
+        return set.intersection(*postings) if postings else set()
+
+    def _rank(self, name: str, query: str) -> int:
+        if name == query:
+            return RANK_EXACT
+        if name.startswith(query):
+            return RANK_NAME_PREFIX
+        if f" {query}" in name:
+            return RANK_WORD_PREFIX
+        return RANK_SUBSTRING
+
+    def search(self, query: Optional[str] = None, section: Optional[str] = None) -> List[schemas.Product]:
+        """Retorna os produtos encontrados, ordenados por relevância e depois por nome."""
+        query = normalize(query)
+        allowed = self.by_section.get(section, set()) if section is not None else None
+
+        if query:
+            # Prefixo via busca binária; trecho via interseção de trigramas e confirmação no nome
+            matches = set(self._prefix_ids(query))
+            matches.update(product_id for product_id in self._substring_candidates(query) if query in self.names[product_id])
+        else:
+            matches = set(self.names)
+        if allowed is not None:
+            matches &= allowed
+
+        ranked = sorted(matches, key=lambda product_id: (self._rank(self.names[product_id], query), self.names[product_id], product_id))
+        return [self.products[product_id] for product_id in ranked]
+
+_index: Optional[ProductSearchIndex] = None
+_index_version: Optional[int] = None
+
+async def get_product_search_index(db: AsyncSession) -> ProductSearchIndex:
+    """Retorna o índice atual, reconstruindo-o se o catálogo mudou desde a última montagem."""
+    global _index, _index_version
+    version = await crud_async.get_catalog_version(db)
+    if _index is None or _index_version != version:
+        products = (await db.scalars(select(models.Product))).all()
+        _index = ProductSearchIndex(schemas.Product.model_validate(product) for product in products)
+        _index_version = version
+    return _index
+
+def reset_product_search_index():
+    global _index, _index_version
+    _index = None
+    _index_version = None
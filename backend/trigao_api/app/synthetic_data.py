@@ -0,0 +1,173 @@
+"""
+Gerador de dados sintéticos em grande volume (usuários e pedidos sobre o catálogo real)
+para testes de escala. Tudo é derivado de uma semente: o mesmo banco de partida e os
+mesmos parâmetros produzem exatamente os mesmos dados, então números de desempenho
+são comparáveis entre execuções.
+
+A popularidade dos produtos (e a atividade dos usuários) segue uma distribuição de
+Zipf: poucos produtos concentram a maior parte das vendas, como no balcão de verdade.
+A carga usa COPY no Postgres (psycopg2) e executemany em lotes nos demais bancos.
+"""
+import csv
+import io
+import itertools
+import random
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import Session
+
+from . import auth, models, reports
+
+GENERATE_BATCH_SIZE = 10_000
+PRODUCT_POPULARITY_SKEW = 1.1
+USER_ACTIVITY_SKEW = 0.8
+MAX_ITEMS_PER_ORDER = 6
+MAX_QUANTITY = 10
+
+# Horário de funcionamento da padaria (pedidos entre 6h e 21h)
+OPENING_SECONDS = 6 * 3600
+CLOSING_SECONDS = 21 * 3600
+
+# --- Distribuições ---
+
+def zipf_cum_weights(n: int, skew: float) -> List[float]:
+    """Pesos acumulados de Zipf (o item de posição k tem peso 1 / k^skew), para random.choices."""
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, n + 1)))
+
+def _small_counts(maximum: int) -> List[float]:
+    # Contagens pequenas são mais comuns: P(k) proporcional a 1 / k
+    return list(itertools.accumulate(1 / k for k in range(1, maximum + 1)))
+
+# --- Escrita em Lotes ---
+
+def _copy_rows(db: Session, table, columns: Sequence[str], rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+def write_rows(db: Session, table, columns: Sequence[str], rows: List[tuple]) -> None:
+    """Grava as linhas com COPY (Postgres + psycopg2) ou com um único executemany."""
+    if not rows:
+        return
+    if db.get_bind().dialect.driver == "psycopg2":
+        _copy_rows(db, table, columns, rows)
+    else:
+        db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+def _next_id(db: Session, column) -> int:
+    return (db.scalar(func.max(column)) or 0) + 1
+
+def _sync_sequences(db: Session, tables: Iterable) -> None:
+    # Os IDs foram gravados explicitamente: no Postgres as sequências precisam acompanhar
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for table in tables:
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+# --- Geração ---
+
+def generate_users(db: Session, rng: random.Random, count: int, prefix: str, password: str,
+                   batch_size: int = GENERATE_BATCH_SIZE) -> List[int]:
+    """Cria `count` usuários comuns (`<prefix>N`, todos com a mesma senha). Retorna os IDs."""
+    # Um único hash para todos: um bcrypt por usuário tornaria a geração lenta demais
+    hashed_password = auth.get_password_hash(password)
+    first_id = _next_id(db, models.User.id)
+    columns = ("id", "username", "email", "hashed_password", "is_active", "role")
+    ids = list(range(first_id, first_id + count))
+    for start in range(0, count, batch_size):
+        rows = [
+            (user_id, f"{prefix}{user_id}", f"{prefix}{user_id}@example.com", hashed_password, True, "user")
+            for user_id in ids[start:start + batch_size]
+        ]
+        write_rows(db, models.User.__table__, columns, rows)
+    return ids
+
+def generate_orders(db: Session, rng: random.Random, user_ids: Sequence[int], count: int, start: date, end: date,
+                    product_skew: float = PRODUCT_POPULARITY_SKEW, user_skew: float = USER_ACTIVITY_SKEW,
+                    max_items: int = MAX_ITEMS_PER_ORDER, batch_size: int = GENERATE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Cria `count` pedidos entre as datas `start` e `end` (inclusivas), no horário de
+    funcionamento, com produtos escolhidos pela popularidade. O preço e a seção de
+    cada item são os atuais do produto. Retorna o número de pedidos e de itens criados.
+    """
+    products = db.query(models.Product.id, models.Product.price, models.Product.section).order_by(models.Product.id).all()
+    if not products:
+        raise ValueError("Nenhum produto cadastrado: importe o catálogo antes de gerar pedidos.")
+    if not user_ids:
+        raise ValueError("Nenhum usuário para os pedidos.")
+    if end < start:
+        raise ValueError("A data final deve ser igual ou posterior à inicial.")
+
+    # A posição de cada produto/usuário no ranking de popularidade também vem da semente
+    products = list(products)
+    rng.shuffle(products)
+    users = list(user_ids)
+    rng.shuffle(users)
+    product_weights = zipf_cum_weights(len(products), product_skew)
+    user_weights = zipf_cum_weights(len(users), user_skew)
+    item_count_weights = _small_counts(min(max_items, len(products)))
+    quantity_weights = _small_counts(MAX_QUANTITY)
+    item_counts = range(1, len(item_count_weights) + 1)
+    quantities = range(1, MAX_QUANTITY + 1)
+
+    first_day = datetime.combine(start, time())
+    days = (end - start).days + 1
+    order_id = _next_id(db, models.Order.id)
+    item_id = _next_id(db, models.OrderItem.id)
+    total_items = 0
+
+    for batch_start in range(0, count, batch_size):
+        n_orders = min(batch_size, count - batch_start)
+        order_rows, item_rows = [], []
+        for _ in range(n_orders):
+            # Um produto aparece no máximo uma vez por pedido
+            picked = {}
+            for product_id, price, section in rng.choices(products, cum_weights=product_weights, k=rng.choices(item_counts, cum_weights=item_count_weights)[0]):
+                picked[product_id] = (price, section)
+            total = 0.0
+            for product_id, (price, section) in picked.items():
+                quantity = rng.choices(quantities, cum_weights=quantity_weights)[0]
+                item_rows.append((item_id, order_id, product_id, quantity, price, section))
+                total += price * quantity
+                item_id += 1
+            created_at = first_day + timedelta(days=rng.randrange(days), seconds=rng.randrange(OPENING_SECONDS, CLOSING_SECONDS))
+            user_id = rng.choices(users, cum_weights=user_weights)[0]
+            order_rows.append((order_id, user_id, round(total, 2), created_at))
+            order_id += 1
+
+        write_rows(db, models.Order.__table__, ("id", "user_id", "total_amount", "created_at"), order_rows)
+        write_rows(db, models.OrderItem.__table__, ("id", "order_id", "product_id", "quantity", "price", "section"), item_rows)
+        db.commit()
+        total_items += len(item_rows)
+
+    return {"orders": count, "items": total_items}
+
+def generate_dataset(db: Session, users: int, orders: int, start: date, end: date, seed: int = 42,
+                     user_prefix: str = "cliente", password: str = "cliente123",
+                     product_skew: float = PRODUCT_POPULARITY_SKEW, batch_size: int = GENERATE_BATCH_SIZE,
+                     rebuild_reports: bool = True) -> Dict[str, int]:
+    """
+    Gera usuários e pedidos sobre o catálogo já importado e, por padrão, reconstrói o
+    consolidado de vendas do período. Deve rodar em um banco sem tráfego: os IDs são
+    atribuídos a partir do maior ID existente.
+    """
+    rng = random.Random(seed)
+    user_ids = generate_users(db, rng, users, user_prefix, password, batch_size=batch_size)
+    db.commit()
+    result = generate_orders(db, rng, user_ids, orders, start, end, product_skew=product_skew, batch_size=batch_size)
+    _sync_sequences(db, (models.User.__table__, models.Order.__table__, models.OrderItem.__table__))
+    db.commit()
+    if rebuild_reports:
+        result["daily_sales_rows"] = reports.rebuild_daily_sales(db, start=start, end=end)
+    return {"users": users, **result}
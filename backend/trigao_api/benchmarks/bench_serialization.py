@@ -0,0 +1,121 @@
+# benchmarks/bench_serialization.py - compara o custo de serialização das listagens grandes
+#
+# Mede, para a listagem de produtos e a de pedidos, o caminho antigo (objetos ORM
+# validados pelo response_model do Pydantic e codificados com json) contra o caminho
+# atual (dicionários montados das colunas e codificados com orjson). Usa um banco
+# SQLite temporário, populado com o catálogo de produtos-trigao.json e pedidos sintéticos.
+#
+# Uso (a partir de backend/trigao_api):
+#   python benchmarks/bench_serialization.py
+#   python benchmarks/bench_serialization.py --orders 2000 --limit 500 --repeat 30
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+from common import configure_database, latency_summary, load_catalog
+
+# O banco precisa estar definido antes de importar a aplicação (a URL é lida na importação)
+configure_database()
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from app import crud, crud_async, models, schemas
+from app.bootstrap import create_schema
+from app.database import AsyncSessionLocal, SessionLocal
+
+
+def seed(n_orders: int, items_per_order: int) -> None:
+    create_schema()
+    db = SessionLocal()
+    try:
+        load_catalog(db)
+        user = models.User(username="bench", email="bench@example.com", hashed_password="-", role=schemas.Role.USER.value)
+        db.add(user)
+        db.commit()
+        product_ids = [product_id for (product_id,) in db.query(models.Product.id)]
+        rng = random.Random(42)
+        orders = [
+            schemas.BatchOrderCreate(user_id=user.id, items=[
+                schemas.OrderItemCreate(product_id=product_id, quantity=rng.randint(1, 5))
+                for product_id in rng.sample(product_ids, min(items_per_order, len(product_ids)))
+            ])
+            for _ in range(n_orders)
+        ]
+        crud.create_orders_batch(db, orders, default_user_id=user.id)
+    finally:
+        db.close()
+
+
+async def _measure(build, repeat: int) -> dict:
+    """Tempo de CPU (ms) por requisição simulada: consulta + serialização do corpo."""
+    samples, size = [], 0
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            start = time.process_time()
+            body = await build(db)
+            samples.append((time.process_time() - start) * 1000)
+            size = len(body)
+    return {"cpu_ms": latency_summary(samples, digits=3), "bytes": size}
+
+
+def _legacy_body(adapter: TypeAdapter, objects) -> bytes:
+    # O que o response_model fazia: valida a partir dos atributos, gera dados JSON e codifica com json
+    models_out = adapter.validate_python(objects, from_attributes=True)
+    return json.dumps(adapter.dump_python(models_out, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+async def run(limit: int, repeat: int) -> dict:
+    products_adapter = TypeAdapter(List[schemas.Product])
+    orders_adapter = TypeAdapter(List[schemas.OrderRead])
+
+    # Caminho antigo: mesma consulta paginada das rotas, mas carregando objetos ORM
+    async def products_legacy(db):
+        products = await db.scalars(crud.paginate_products(select(models.Product), 0, limit, None))
+        return _legacy_body(products_adapter, products.all())
+
+    async def products_fast(db):
+        return orjson.dumps(await crud_async.get_product_rows(db, limit=limit))
+
+    async def orders_legacy(db):
+        orders = await db.scalars(crud.paginate_orders(select(models.Order).options(*crud.ORDER_LOAD_OPTIONS), 0, limit, None))
+        return _legacy_body(orders_adapter, orders.all())
+
+    async def orders_fast(db):
+        return orjson.dumps(await crud_async.get_order_rows(db, limit=limit))
+
+    results = {}
+    for name, legacy, fast in (("products", products_legacy, products_fast), ("orders", orders_legacy, orders_fast)):
+        # Aquecimento (conexões, compilação das consultas) antes de medir
+        await _measure(legacy, 2)
+        await _measure(fast, 2)
+        legacy_stats = await _measure(legacy, repeat)
+        fast_stats = await _measure(fast, repeat)
+        results[name] = {
+            "orm_pydantic_json": legacy_stats,
+            "rows_orjson": fast_stats,
+            "speedup": round(legacy_stats["cpu_ms"]["mean"] / fast_stats["cpu_ms"]["mean"], 2) if fast_stats["cpu_ms"]["mean"] else None,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a serialização das listagens de produtos e pedidos.")
+    parser.add_argument("--orders", type=int, default=1000, help="Pedidos sintéticos a criar")
+    parser.add_argument("--items", type=int, default=5, help="Itens por pedido")
+    parser.add_argument("--limit", type=int, default=500, help="Tamanho da página listada")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetições medidas por caminho")
+    args = parser.parse_args()
+
+    seed(args.orders, args.items)
+    results = asyncio.run(run(args.limit, args.repeat))
+    print(json.dumps({"limit": args.limit, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_startup.py - mede quanto tempo um worker leva para ficar pronto
+#
+# Para cada repetição, em processos novos:
+#   - import: tempo de `import app.main` (e se algum engine foi criado na importação);
+#   - dependencies: tempo de importar só as bibliotecas que app.main exige (FastAPI,
+#     SQLAlchemy, Pydantic + email-validator), o piso que a aplicação não tem como evitar;
+#   - ready: tempo entre iniciar `uvicorn app.main:app` e o primeiro 200 de /health/ready
+#     (inclui a subida do interpretador, a importação, o lifespan e a primeira consulta).
+# O banco é um SQLite temporário preparado com init_db.py (ou o indicado em --database-url).
+#
+# Uso (a partir de backend/trigao_api):
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repeat 10 --output startup.json
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from common import BASE_DIR, bench_database_url, write_report
+
+IMPORT_PROBE = (
+    "import time; started = time.perf_counter(); import app.main; elapsed = time.perf_counter() - started; "
+    "import app.database as d, json; print(json.dumps({'seconds': elapsed, 'engines_created': d.engines_created()}))"
+)
+
+DEPENDENCY_PROBE = (
+    "import time; started = time.perf_counter(); "
+    "import fastapi, fastapi.security, sqlalchemy.orm, sqlalchemy.ext.asyncio, pydantic, email_validator; "
+    "import json; print(json.dumps({'seconds': time.perf_counter() - started}))"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict, probe: str = IMPORT_PROBE) -> dict:
+    output = subprocess.run([sys.executable, "-c", probe], cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure_ready(env: dict, timeout: float) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health/ready"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"O uvicorn terminou antes de ficar pronto (código {server.returncode}).")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"O worker não ficou pronto em {timeout}s.")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _summary(samples) -> dict:
+    ms = sorted(sample * 1000 for sample in samples)
+    return {"p50_ms": round(statistics.median(ms), 1), "min_ms": round(ms[0], 1), "max_ms": round(ms[-1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o tempo de importação e de prontidão de um worker da API.")
+    parser.add_argument("--database-url", help="Banco já preparado (padrão: SQLite temporário criado com init_db.py)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições de cada medição")
+    parser.add_argument("--timeout", type=float, default=30, help="Tempo máximo (s) esperando um worker ficar pronto")
+    parser.add_argument("--output", help="Grava o resultado JSON neste arquivo (além de imprimir)")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    else:
+        env["DATABASE_URL"] = bench_database_url()
+        subprocess.run([sys.executable, "init_db.py"], cwd=BASE_DIR, env=env, check=True, capture_output=True)
+
+    # Primeira importação compila os .pyc: não entra na medição
+    measure_import(env)
+    imports = [measure_import(env) for _ in range(args.repeat)]
+    dependencies = [measure_import(env, DEPENDENCY_PROBE)["seconds"] for _ in range(args.repeat)]
+    ready = [measure_ready(env, args.timeout) for _ in range(args.repeat)]
+
+    report = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "import_app_main": {**_summary([sample["seconds"] for sample in imports]),
+                            "engines_created_on_import": any(sample["engines_created"] for sample in imports)},
+        "import_dependencies": _summary(dependencies),
+        "uvicorn_until_ready": _summary(ready),
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
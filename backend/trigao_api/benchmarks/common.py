@@ -0,0 +1,134 @@
+# benchmarks/common.py - partes compartilhadas pelos scripts de benchmark
+#
+# Banco descartável, argumentos comuns, disparo concorrente de requisições contra a
+# aplicação (transporte ASGI do httpx), estatísticas de latência e saída em JSON.
+#
+# A aplicação lê DATABASE_URL ao ser importada: os scripts chamam configure_database()
+# antes de importar `app`, e por isso as funções abaixo que usam `app` o importam só
+# quando chamadas.
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+BENCH_PASSWORD = "bench123"
+
+# --- Banco e argumentos ---
+
+def bench_parser(description: str) -> argparse.ArgumentParser:
+    """Parser com --database-url, --seed e --output, comuns aos benchmarks."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--database-url", help="Banco descartável (padrão: SQLite temporário)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente dos dados e das requisições")
+    parser.add_argument("--output", help="Grava o resultado JSON neste arquivo (além de imprimir)")
+    return parser
+
+
+def bench_database_url(database_url: Optional[str] = None) -> str:
+    """A URL indicada ou um SQLite em um diretório temporário novo."""
+    return database_url or f"sqlite:///{tempfile.mkdtemp(prefix='trigao-bench-')}/bench.db"
+
+
+def configure_database(database_url: Optional[str] = None) -> None:
+    """Aponta a aplicação para o banco do benchmark. Deve rodar antes de importar `app`."""
+    os.environ["DATABASE_URL"] = bench_database_url(database_url)
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+# --- Dados ---
+
+def load_catalog(db) -> None:
+    """Importa o catálogo real (produtos-trigao.json)."""
+    from app.catalog_import import import_catalog
+
+    with open(BASE_DIR / "produtos-trigao.json", encoding="utf-8") as fp:
+        import_catalog(db, fp)
+
+
+def create_bench_users(db, prefix: str, count: int) -> List[str]:
+    """Cria (se ainda não existirem) `count` usuários comuns e retorna seus nomes."""
+    from app import crud, schemas
+
+    usernames = []
+    for i in range(count):
+        username = f"{prefix}{i}"
+        if crud.get_user_by_username(db, username) is None:
+            crud.create_user(db, schemas.UserCreate(username=username, email=f"{username}@example.com", password=BENCH_PASSWORD))
+        usernames.append(username)
+    return usernames
+
+
+def bearer_headers(usernames: List[str]) -> List[Dict[str, str]]:
+    # Tokens emitidos direto, sem passar pelo login (e pelo bcrypt)
+    from app import schemas
+    from app.auth import create_access_token
+
+    return [{"Authorization": f"Bearer {create_access_token(data={'sub': username, 'role': schemas.Role.USER.value})}"} for username in usernames]
+
+# --- Medição ---
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(samples: List[float], digits: int = 2) -> Dict[str, float]:
+    """Média, p50/p95/p99 e máximo das amostras (em ms)."""
+    return {
+        "mean": round(statistics.mean(samples), digits),
+        "p50": round(percentile(samples, 50), digits),
+        "p95": round(percentile(samples, 95), digits),
+        "p99": round(percentile(samples, 99), digits),
+        "max": round(max(samples), digits),
+    }
+
+
+async def run_concurrently(client, make_request: Callable[..., Awaitable], n_requests: int,
+                           concurrency: int) -> Tuple[List[float], Counter, float]:
+    """
+    Executa `make_request(client, i)` para i em 0..n_requests-1 com `concurrency`
+    requisições simultâneas. Retorna as latências (ms), os códigos de status e o tempo total (s).
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = iter(range(n_requests))
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def status_codes(statuses: Counter) -> Dict[str, int]:
+    return {str(code): count for code, count in sorted(statuses.items())}
+
+# --- Saída ---
+
+def database_label() -> str:
+    from app.database import get_engine
+
+    return get_engine().url.render_as_string(hide_password=True)
+
+
+def write_report(report: dict, output: Optional[str] = None) -> None:
+    """Imprime o relatório em JSON e, com `output`, grava também no arquivo."""
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
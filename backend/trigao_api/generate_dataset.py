@@ -0,0 +1,72 @@
+# generate_dataset.py - gera usuários e pedidos sintéticos em grande volume para testes de escala
+#
+# Usa o catálogo real (importado de produtos-trigao.json se o banco ainda não tiver
+# produtos). Os dados são reproduzíveis: mesma semente + mesmo banco de partida = mesmos dados.
+# Deve ser usado em um banco de teste, sem tráfego.
+#
+# Uso:
+#   python generate_dataset.py --users 20000 --orders 1000000
+#   python generate_dataset.py --users 500 --orders 50000 --start 2024-01-01 --end 2024-06-30 --seed 7
+
+import argparse
+import logging
+import time
+from datetime import date, timedelta
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    from app.database import SessionLocal
+    from app.bootstrap import create_schema
+    from app.models import Product
+    from app.catalog_import import import_catalog
+    from app.synthetic_data import PRODUCT_POPULARITY_SKEW, GENERATE_BATCH_SIZE, generate_dataset
+except ImportError as e:
+    logging.error(f"Erro ao importar módulos da aplicação: {e}")
+    logging.error("Certifique-se de que o script está sendo executado no contexto correto do projeto.")
+    exit(1)
+
+
+def main():
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Gera usuários e pedidos sintéticos sobre o catálogo real.")
+    parser.add_argument("--users", type=int, default=10_000, help="Usuários a criar")
+    parser.add_argument("--orders", type=int, default=100_000, help="Pedidos a criar")
+    parser.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=365), help="Primeiro dia (AAAA-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="Último dia (AAAA-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42, help="Semente (mesma semente = mesmos dados)")
+    parser.add_argument("--skew", type=float, default=PRODUCT_POPULARITY_SKEW, help="Expoente de Zipf da popularidade dos produtos")
+    parser.add_argument("--batch-size", type=int, default=GENERATE_BATCH_SIZE, help="Pedidos por lote gravado")
+    parser.add_argument("--prefix", default="cliente", help="Prefixo dos nomes de usuário")
+    parser.add_argument("--password", default="cliente123", help="Senha de todos os usuários gerados")
+    parser.add_argument("--catalog", default="produtos-trigao.json", help="Catálogo importado se não houver produtos")
+    args = parser.parse_args()
+
+    create_schema()
+    db = SessionLocal()
+    try:
+        if db.query(Product.id).first() is None:
+            logging.info(f"Nenhum produto no banco. Importando o catálogo de '{args.catalog}'...")
+            with open(args.catalog, encoding="utf-8") as fp:
+                import_catalog(db, fp)
+
+        logging.info(f"Gerando {args.users} usuários e {args.orders} pedidos de {args.start} a {args.end} (semente {args.seed})...")
+        started = time.perf_counter()
+        result = generate_dataset(
+            db, users=args.users, orders=args.orders, start=args.start, end=args.end, seed=args.seed,
+            user_prefix=args.prefix, password=args.password, product_skew=args.skew, batch_size=args.batch_size,
+        )
+        elapsed = time.perf_counter() - started
+        logging.info(
+            f"SUCESSO: {result['users']} usuários, {result['orders']} pedidos e {result['items']} itens "
+            f"em {elapsed:.1f}s ({result['orders'] / elapsed:.0f} pedidos/s); "
+            f"{result['daily_sales_rows']} linhas de consolidado diário."
+        )
+    except Exception as e:
+        logging.error(f"Erro ao gerar os dados: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# init_db.py - prepara o banco: cria as tabelas/índices que faltam e o administrador inicial
+#
+# Deve rodar uma vez a cada deploy, antes de subir os workers da API (que não alteram o
+# schema nem criam usuários ao iniciar). É idempotente.
+#
+# Uso:
+#   python init_db.py
+#   ADMIN_PASSWORD=... python init_db.py        # senha do administrador inicial
+
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    from app.database import SessionLocal
+    from app.bootstrap import create_schema, ensure_admin_user
+except ImportError as e:
+    logging.error(f"Erro ao importar módulos da aplicação: {e}")
+    logging.error("Certifique-se de que o script está sendo executado no contexto correto do projeto.")
+    exit(1)
+
+
+def main():
+    logging.info("Criando tabelas e índices que ainda não existem...")
+    create_schema()
+
+    db = SessionLocal()
+    try:
+        admin = ensure_admin_user(db)
+        if admin:
+            logging.info(f"Usuário ADMIN '{admin.username}' criado com sucesso.")
+        else:
+            logging.info("Usuário ADMIN já existe. Pulando.")
+    except Exception as e:
+        logging.error(f"Erro ao criar o usuário ADMIN: {e}", exc_info=True)
+        db.rollback()
+        raise SystemExit(1)
+    finally:
+        db.close()
+    logging.info("Banco de dados pronto.")
+
+if __name__ == "__main__":
+    main()
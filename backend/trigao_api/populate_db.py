@@ -1,8 +1,6 @@
 # populate_db.py (versão final, lendo do arquivo JSON do usuário)
 
-import json
 import logging
-from decimal import Decimal, InvalidOperation
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -11,6 +9,8 @@ try:
     from app.models import User, Product, Order, OrderItem
     from app.schemas import Role
     from app.auth import get_password_hash
+    from app.catalog_import import import_catalog
+    from app.bootstrap import create_schema
 except ImportError as e:
     logging.error(f"Erro ao importar módulos da aplicação: {e}")
     logging.error("Certifique-se de que o script está sendo executado no contexto correto do projeto.")
@@ -42,62 +42,28 @@ def create_initial_users(db):
 
 
 def create_products_from_json(db, file_path="produtos-trigao.json"):
-    """Lê um arquivo JSON, processa os produtos e os cria no banco se não existirem."""
-    logging.info(f"Iniciando a criação de produtos a partir do arquivo '{file_path}'...")
+    """Importa os produtos do arquivo JSON: cria os novos e atualiza os que mudaram (upsert em lotes)."""
+    logging.info(f"Iniciando a importação de produtos a partir do arquivo '{file_path}'...")
 
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            result = import_catalog(db, f)
     except FileNotFoundError:
         logging.error(f"ERRO CRÍTICO: O arquivo de produtos '{file_path}' não foi encontrado. Abortando criação de produtos.")
         return
-    except json.JSONDecodeError:
-        logging.error(f"ERRO CRÍTICO: O arquivo '{file_path}' contém um JSON inválido.")
+    except ValueError as e:
+        db.rollback()
+        logging.error(f"ERRO CRÍTICO: O arquivo '{file_path}' contém um JSON inválido: {e}")
         return
 
-    products_to_add = []
-    for section_name, products_in_section in data.items():
-        for product_data in products_in_section:
-            # Pula produtos marcados como inativos
-            if "inativo" in product_data.get("product_name", "").lower():
-                continue
-            
-            # Valida e converte o preço para Decimal
-            try:
-                price = Decimal(str(product_data.get("price", "0")))
-            except InvalidOperation:
-                logging.warning(f"Preço inválido para o produto '{product_data.get('product_name')}'. Usando 0.0.")
-                price = Decimal("0.0")
-
-            code = str(product_data.get("code"))
-            if not code or code == 'None':
-                logging.warning(f"Produto '{product_data.get('product_name')}' sem código. Pulando.")
-                continue
-
-            # Verifica se o produto já existe pelo código
-            product_exists = db.query(Product).filter(Product.code == code).first()
-            if product_exists:
-                continue # Silenciosamente pula para não poluir o log com centenas de mensagens
-
-            # Adiciona o produto à lista para criação
-            products_to_add.append(
-                Product(
-                    code=code,
-                    product_name=product_data.get("product_name"),
-                    unit=product_data.get("unit"),
-                    tax=product_data.get("tax"),
-                    section=product_data.get("section"),
-                    price=price
-                )
-            )
-
-    if not products_to_add:
-        logging.info("Nenhum produto novo para adicionar do arquivo JSON. Todos já existem no banco de dados.")
+    if not result.written:
+        logging.info("Nenhum produto novo ou alterado no arquivo JSON. O catálogo já está atualizado.")
         return
 
-    db.add_all(products_to_add)
-    db.commit()
-    logging.info(f"SUCESSO: {len(products_to_add)} novos produtos foram criados a partir do arquivo '{file_path}'.")
+    logging.info(
+        f"SUCESSO: {result.written} produtos criados ou atualizados a partir do arquivo '{file_path}' "
+        f"({result.unique} produtos válidos, {result.skipped} ignorados; versão do catálogo {result.version})."
+    )
 
 
 def create_sample_orders(db):
@@ -133,6 +99,7 @@ def create_sample_orders(db):
 
 def main():
     logging.info("Iniciando o processo de povoamento do banco de dados...")
+    create_schema()
     db = SessionLocal()
     try:
         create_initial_users(db)
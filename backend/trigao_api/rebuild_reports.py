@@ -0,0 +1,40 @@
+# rebuild_reports.py - reconstrói o consolidado diário de vendas a partir dos pedidos
+#
+# Uso:
+#   python rebuild_reports.py                                # todo o histórico
+#   python rebuild_reports.py --start 2024-01-01 --end 2024-01-31
+
+import argparse
+import logging
+from datetime import date
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    from app.database import SessionLocal
+    from app.reports import rebuild_daily_sales
+except ImportError as e:
+    logging.error(f"Erro ao importar módulos da aplicação: {e}")
+    logging.error("Certifique-se de que o script está sendo executado no contexto correto do projeto.")
+    exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói a tabela daily_sales a partir dos pedidos.")
+    parser.add_argument("--start", type=date.fromisoformat, help="Primeiro dia (AAAA-MM-DD), inclusivo")
+    parser.add_argument("--end", type=date.fromisoformat, help="Último dia (AAAA-MM-DD), inclusivo")
+    args = parser.parse_args()
+
+    logging.info(f"Reconstruindo o consolidado de vendas (de {args.start or 'início'} até {args.end or 'hoje'})...")
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_sales(db, start=args.start, end=args.end)
+        logging.info(f"SUCESSO: {rows} linhas de consolidado diário gravadas.")
+    except Exception as e:
+        logging.error(f"Erro ao reconstruir o consolidado: {e}", exc_info=True)
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
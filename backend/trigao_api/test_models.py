@@ -30,7 +30,7 @@ def run_test():
         print("\nTentando criar um pedido com 2 itens...")
 
         # 4. Chamar a função CRUD para criar o pedido
-        novo_pedido = crud.create_order(db=db, user_id=admin_user.id, items_in=items_para_o_pedido)
+        novo_pedido = crud.create_order(db=db, order_in=schemas.OrderCreate(items=items_para_o_pedido), user_id=admin_user.id)
 
         # 5. Verificar e imprimir os resultados
         print("\n--- SUCESSO! Pedido criado ---")
@@ -1,15 +1,20 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import sessionmaker, Session 
 
 from app import schemas
 
 from app.main import app
 from app.database import Base
-from app.auth import get_db, create_access_token
+from app.auth import get_db, get_async_db, get_read_db, get_async_replica_db, create_access_token, clear_auth_caches
 from app.schemas import Role
 from app import models, crud
+from app.search import reset_product_search_index
+from app.catalog_snapshot import reset_catalog_snapshot
 
 # --- Configuração do Banco de Dados de Teste ---
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -18,6 +23,11 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Mesmo arquivo de banco para as rotas assíncronas. NullPool: o TestClient pode usar
+# um event loop diferente a cada requisição, então nenhuma conexão é reaproveitada.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base.metadata.create_all(bind=engine)
 
 # --- Fixtures do Pytest ---
@@ -42,9 +52,21 @@ def client(db_session):
         # Usar db_session aqui dentro, que é recriada para cada teste
         yield db_session
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Sem réplica nos testes: as sessões de leitura usam o mesmo banco (veja test_read_replica.py)
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_replica_db] = override_get_async_db
+    # O banco é recriado a cada teste: usuários em cache de um teste anterior não podem vazar
+    clear_auth_caches()
+    reset_product_search_index()
+    reset_catalog_snapshot()
     yield TestClient(app)
-    del app.dependency_overrides[get_db]
+    app.dependency_overrides.clear()
 
 # 👇 MUDANÇA AQUI 👇
 @pytest.fixture(scope="function")
@@ -60,4 +82,67 @@ def normal_user_auth_headers(client: TestClient, db_session: Session):
     """Cria um usuário USER e retorna cabeçalhos de autenticação para ele."""
     user = crud.create_user(db_session, schemas.UserCreate(username="testuser", email="user@test.com", password="password"), role=Role.USER)
     token = create_access_token(data={"sub": user.username, "role": user.role})
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="function")
+def session_factory():
+    """Fábrica de Session do banco de testes, para código que roda em outras threads."""
+    return TestingSessionLocal
+
+@pytest.fixture(scope="function")
+def async_session_factory():
+    """Fábrica de AsyncSession do banco de testes, para componentes que abrem as próprias sessões."""
+    return TestingAsyncSessionLocal
+
+@pytest.fixture(scope="function")
+def query_counter():
+    """Conta as instruções SQL executadas no banco de testes enquanto a fixture está ativa."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture(scope="function")
+def query_budget():
+    """
+    Orçamento de consultas: `with query_budget(3, "descrição"):` falha o teste se o bloco
+    executar mais de 3 instruções SQL nos bancos de teste, listando as instruções executadas.
+    O bloco recebe a lista de instruções (SQL, parâmetros) para verificações adicionais.
+    """
+    @contextmanager
+    def budget(max_statements: int, description: str):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        engines = (engine, async_engine.sync_engine)
+        for target in engines:
+            event.listen(target, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+        if len(statements) > max_statements:
+            listing = "\n".join(
+                f"  {i}. {' '.join(statement.split())}  -- {parameters!r}"[:500]
+                for i, (statement, parameters) in enumerate(statements, 1)
+            )
+            pytest.fail(
+                f"Orçamento de consultas excedido em '{description}': {len(statements)} instruções "
+                f"(máximo {max_statements}):\n{listing}",
+                pytrace=False,
+            )
+
+    return budget
@@ -0,0 +1,122 @@
+# tests/test_admin.py
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import schemas, crud
+from app.catalog_import import iter_catalog_products
+from app.routers import admin
+from tests.conftest import async_engine, engine
+
+def test_db_pool_status_as_admin(client: TestClient, admin_auth_headers: dict, monkeypatch):
+    # Pools dos engines de teste, e não dos criados a partir de DATABASE_URL
+    monkeypatch.setattr(admin, "get_engine", lambda: engine)
+    monkeypatch.setattr(admin, "get_async_engine", lambda: async_engine)
+    monkeypatch.setattr(admin, "read_replica_configured", lambda: False)
+    response = client.get("/api/v1/admin/db-pool", headers=admin_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"config", "sync_pool", "async_pool", "read_sync_pool", "read_async_pool"}
+    assert data["config"]["pool_size"] > 0
+    assert "pool_class" in data["sync_pool"]
+    # Sem DATABASE_READ_URL não há pools de réplica
+    assert data["read_sync_pool"] is None and data["read_async_pool"] is None
+
+def test_db_pool_status_as_user_is_forbidden(client: TestClient, normal_user_auth_headers: dict):
+    response = client.get("/api/v1/admin/db-pool", headers=normal_user_auth_headers)
+    assert response.status_code == 403
+
+def _catalog_file(products_by_section: dict):
+    return {"file": ("produtos.json", json.dumps(products_by_section).encode("utf-8"), "application/json")}
+
+def test_catalog_import_inserts_and_updates(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    crud.create_product(db_session, schemas.ProductCreate(code="1088", product_name="BAGUETE KG", unit="UN", price=20.0, section="1"))
+    catalog = {
+        "1": [
+            {"code": "1088", "product_name": "BAGUETE KG", "unit": "UN", "tax": "F00", "section": "1", "price": 22.5},
+            {"code": "1302", "product_name": "FARINHA DE ROSCA KG", "unit": "KG", "tax": "F00", "section": "1", "price": 12.0},
+        ],
+        "2": [
+            {"code": "9999", "product_name": "PRODUTO INATIVO", "unit": "UN", "section": "2", "price": 1.0},
+            {"code": "1302", "product_name": "FARINHA DE ROSCA KG", "unit": "KG", "tax": "F00", "section": "2", "price": 13.0},
+        ],
+    }
+
+    response = client.post("/api/v1/admin/catalog/import", files=_catalog_file(catalog), headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.json() | {"version": None} == {"read": 4, "skipped": 1, "unique": 2, "written": 2, "version": None}
+
+    db_session.expire_all()
+    assert crud.get_product_by_code(db_session, "1088").price == 22.5
+    assert crud.get_product_by_code(db_session, "1302").section == "2"  # Última ocorrência vence
+
+    # Reimportar o mesmo arquivo não altera nada nem muda a versão do catálogo
+    version = response.json()["version"]
+    response = client.post("/api/v1/admin/catalog/import", files=_catalog_file(catalog), headers=admin_auth_headers)
+    assert response.json()["written"] == 0
+    assert response.json()["version"] == version
+
+def test_catalog_import_skips_malformed_rows(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    # Linhas que o banco recusaria (NOT NULL, unidade longa demais) são puladas, sem derrubar a importação
+    catalog = {
+        "1": [
+            {"code": "1088", "product_name": "BAGUETE KG", "unit": "UN", "tax": "F00", "section": "1", "price": 22.5},
+            {"code": "2001", "unit": "UN", "section": "1", "price": 1.0},
+            {"code": "2002", "product_name": "SEM UNIDADE", "section": "1", "price": 1.0},
+            {"code": "2003", "product_name": 42, "unit": "UN", "section": "1", "price": 1.0},
+            {"code": "2004", "product_name": "UNIDADE LONGA", "unit": "PACOTE", "section": "1", "price": 1.0},
+            {"code": "2005", "product_name": "SECAO NUMERICA", "unit": "KG", "section": 3, "price": 4.0},
+        ],
+    }
+
+    response = client.post("/api/v1/admin/catalog/import", files=_catalog_file(catalog), headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.json() | {"version": None} == {"read": 6, "skipped": 4, "unique": 2, "written": 2, "version": None}
+    assert crud.get_product_by_code(db_session, "2005").section == "3"
+    assert crud.get_product_by_code(db_session, "2001") is None
+
+def test_catalog_import_invalid_json(client: TestClient, admin_auth_headers: dict):
+    files = {"file": ("produtos.json", b'{"1": [{"code": "1"', "application/json")}
+    response = client.post("/api/v1/admin/catalog/import", files=files, headers=admin_auth_headers)
+    assert response.status_code == 400
+
+def test_iter_catalog_products_streams_supplier_file():
+    # Blocos pequenos forçam a leitura incremental a atravessar valores partidos
+    with open("produtos-trigao.json", encoding="utf-8") as f:
+        streamed = list(iter_catalog_products(f, chunk_size=7))
+    with open("produtos-trigao.json", encoding="utf-8") as f:
+        expected = [(section, product) for section, products in json.load(f).items() for product in products]
+    assert streamed == expected
+
+def test_export_orders_csv_and_ndjson(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="EX1", product_name="Pão, \"Especial\"", unit="UN", price=2.0))
+    order = client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 2}, {"product_id": product.id, "quantity": 1}]}, headers=admin_auth_headers).json()
+
+    response = client.get("/api/v1/admin/orders/export?format=csv", headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(int(r["order_id"]), r["product_name"], int(r["quantity"])) for r in rows] == [
+        (order["id"], "Pão, \"Especial\"", 2),
+        (order["id"], "Pão, \"Especial\"", 1),
+    ]
+
+    response = client.get("/api/v1/admin/orders/export?format=ndjson", headers=admin_auth_headers)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["id"] == order["id"]
+    assert lines[0]["total_amount"] == 6.0
+    assert [item["quantity"] for item in lines[0]["items"]] == [2, 1]
+
+def test_export_orders_date_filter(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="EX2", product_name="Bolo", unit="UN", price=2.0))
+    client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 1}]}, headers=admin_auth_headers)
+
+    response = client.get("/api/v1/admin/orders/export?format=ndjson&end=2000-01-01", headers=admin_auth_headers)
+    assert response.status_code == 200
+    assert response.text == ""
+
+    response = client.get("/api/v1/admin/orders/export?format=xml", headers=admin_auth_headers)
+    assert response.status_code == 422
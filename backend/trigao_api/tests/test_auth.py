@@ -1,5 +1,7 @@
 # tests/test_auth.py
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import auth, schemas, crud
 
 def test_login_success(client: TestClient, admin_auth_headers: dict):
     # O próprio fixture 'admin_auth_headers' já testa a criação de usuário e o login.
@@ -26,4 +28,51 @@ def test_protected_route_bad_token(client: TestClient):
     headers = {"Authorization": "Bearer badtoken"}
     response = client.get("/api/v1/products/", headers=headers)
     assert response.status_code == 401
-    assert response.json()["detail"] == "Não foi possível validar as credenciais"
\ No newline at end of file
+    assert response.json()["detail"] == "Não foi possível validar as credenciais"
+
+def test_authenticated_request_uses_user_cache(client: TestClient, normal_user_auth_headers: dict, query_counter: list):
+    client.get("/api/v1/orders/", headers=normal_user_auth_headers)
+    query_counter.clear()
+
+    response = client.get("/api/v1/orders/", headers=normal_user_auth_headers)
+    assert response.status_code == 200
+    assert not [s for s in query_counter if "FROM users" in s]
+
+def test_deactivated_user_cache_is_invalidated(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    assert client.get("/api/v1/orders/", headers=normal_user_auth_headers).status_code == 200
+
+    user = crud.get_user_by_username(db_session, username="testuser")
+    crud.set_user_active(db_session, user, is_active=False)
+
+    response = client.get("/api/v1/orders/", headers=normal_user_auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Usuário inativo"
+
+def test_role_change_cache_is_invalidated(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    product_data = {"code": "R1", "product_name": "Pão Perfil", "unit": "UN", "price": 1.0}
+    assert client.post("/api/v1/products/", json=product_data, headers=normal_user_auth_headers).status_code == 403
+
+    user = crud.get_user_by_username(db_session, username="testuser")
+    crud.set_user_role(db_session, user, schemas.Role.ADMIN)
+
+    assert client.post("/api/v1/products/", json=product_data, headers=normal_user_auth_headers).status_code == 201
+
+def test_login_rehashes_outdated_password_hash(client: TestClient, db_session: Session):
+    user = crud.create_user(db_session, schemas.UserCreate(username="oldhash", email="old@test.com", password="password"))
+    crud.update_password_hash(db_session, user, auth.pwd_context.hash("password", rounds=4))
+
+    response = client.post("/api/v1/auth/token", data={"username": "oldhash", "password": "password"})
+    assert response.status_code == 200
+    assert "access_token" in response.json()
+
+    db_session.refresh(user)
+    assert user.hashed_password.startswith(f"$2b${auth.BCRYPT_ROUNDS:02d}$")
+    assert auth.verify_password("password", user.hashed_password)
+
+def test_login_rejected_when_password_queue_is_full(client: TestClient, db_session: Session, monkeypatch):
+    crud.create_user(db_session, schemas.UserCreate(username="busy", email="busy@test.com", password="password"))
+    monkeypatch.setattr(auth.password_verifier, "max_pending", 0)
+
+    response = client.post("/api/v1/auth/token", data={"username": "busy", "password": "password"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,48 @@
+# tests/test_health.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app import bootstrap, crud, schemas
+from app.auth import get_async_db, verify_password
+from app.main import app
+
+def test_liveness_and_readiness(client: TestClient):
+    assert client.get("/health/live").json() == {"status": "ok"}
+    assert client.get("/health/ready").json() == {"status": "ready"}
+
+def test_readiness_without_schema(client: TestClient, tmp_path):
+    # Banco acessível, mas sem as tabelas (init_db.py não rodou): o worker não está pronto
+    empty_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'vazio.db'}", poolclass=NullPool)
+    EmptySession = async_sessionmaker(bind=empty_engine)
+
+    async def override_get_async_db():
+        async with EmptySession() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert "init_db.py" in response.json()["detail"]
+
+def test_ensure_admin_user_is_idempotent(db_session: Session):
+    admin = bootstrap.ensure_admin_user(db_session, password="segredo")
+    assert admin.role == schemas.Role.ADMIN.value
+    assert verify_password("segredo", admin.hashed_password)
+    assert bootstrap.ensure_admin_user(db_session, password="outra") is None
+    assert len([u for u in crud.get_users(db_session) if u.username == admin.username]) == 1
+
+def test_importing_the_app_has_no_side_effects(tmp_path):
+    # Importar a aplicação não cria engines, não conecta e não cria o arquivo do banco
+    database = tmp_path / "nao-criado.db"
+    code = "import app.main, app.database as d; assert not d.engines_created()"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent, env=env, check=True)
+    assert not database.exists()
@@ -0,0 +1,71 @@
+# tests/test_metrics.py
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app import schemas, crud, metrics
+
+def _metric(body: str, prefix: str) -> float:
+    lines = [line for line in body.splitlines() if line.startswith(prefix)]
+    assert len(lines) == 1, f"esperada uma série para {prefix!r}, encontradas: {lines}"
+    return float(lines[0].rsplit(" ", 1)[1])
+
+def test_metrics_per_route_template(client: TestClient, db_session: Session, normal_user_auth_headers: dict, admin_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="M1", product_name="Pão Métrica", unit="UN", price=1.0))
+    order_id = client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 1}]}, headers=normal_user_auth_headers).json()["id"]
+    metrics.registry.clear()
+
+    for _ in range(3):
+        assert client.get(f"/api/v1/orders/{order_id}", headers=normal_user_auth_headers).status_code == 200
+    assert client.get("/api/v1/orders/999999", headers=normal_user_auth_headers).status_code == 404
+    client.get("/nao-existe")
+
+    body = client.get("/metrics", headers=admin_auth_headers).text
+    labels = '{method="GET",route="/api/v1/orders/{order_id}",status="200"}'
+    assert _metric(body, f"http_request_duration_seconds_count{labels}") == 3
+    # Cada requisição consulta o pedido (com itens e produtos), então há instruções SQL e tempo no banco
+    assert _metric(body, f"db_statements_per_request_sum{labels}") >= 3 * 3
+    assert _metric(body, f"db_time_seconds_total{labels}") > 0
+    assert _metric(body, 'http_request_duration_seconds_count{method="GET",route="/api/v1/orders/{order_id}",status="404"}') == 1
+    assert _metric(body, 'http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"}') == 1
+
+def test_slow_request_is_logged_with_statements(client: TestClient, normal_user_auth_headers: dict, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/api/v1/products/", headers=normal_user_auth_headers)
+
+    [record] = [r for r in caplog.records if "GET /api/v1/products/" in r.getMessage()]
+    assert "SELECT" in record.getMessage()
+
+def test_metrics_token(client: TestClient, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "segredo")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer outro"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer segredo"}).status_code == 200
+
+def test_metrics_require_admin_without_token(client: TestClient, normal_user_auth_headers: dict, admin_auth_headers: dict):
+    # Sem METRICS_TOKEN, /metrics não fica aberto: só administradores
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=normal_user_auth_headers).status_code == 403
+    assert client.get("/metrics", headers=admin_auth_headers).status_code == 200
+
+def test_failed_statement_leaves_nothing_on_the_connection(db_session: Session):
+    # Uma instrução que falha não tem after_cursor_execute: nada dela pode ficar na conexão do pool
+    # (os hooks estão na classe Engine, registrados por app.main)
+    stats = metrics.RequestStats()
+    token = metrics._current_request.set(stats)
+    try:
+        connection = db_session.connection()
+        info_before = dict(connection.info)
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                connection.exec_driver_sql("SELECT * FROM tabela_que_nao_existe")
+        assert connection.info == info_before
+        connection.exec_driver_sql("SELECT 1")
+    finally:
+        metrics._current_request.reset(token)
+        db_session.rollback()
+    assert stats.statements == ["SELECT 1"]
+    assert stats.db_time > 0
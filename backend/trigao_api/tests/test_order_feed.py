@@ -0,0 +1,172 @@
+# tests/test_order_feed.py
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import crud, crud_async, order_feed, schemas
+from app.order_feed import OrderFeed, Resync, sse_stream
+
+TIMEOUT = 5  # Segundos; o poll periódico dos testes é bem maior, então só notify_new_orders() entrega a tempo
+
+@pytest.fixture
+def feed(async_session_factory, monkeypatch):
+    """Feed ligado ao banco de testes e registrado como o feed do worker (recebe notify_new_orders)."""
+    feed = OrderFeed(async_session_factory, poll_seconds=60)
+    monkeypatch.setattr(order_feed, "_feed", feed)
+    return feed
+
+@pytest.fixture
+def order_data(db_session: Session):
+    user = crud.create_user(db_session, schemas.UserCreate(username="cozinha", email="cozinha@test.com", password="password"))
+    product = crud.create_product(db_session, schemas.ProductCreate(code="FEED1", product_name="Pão de Queijo", unit="UN", price=0.8))
+    return user.id, schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product.id, quantity=10)])
+
+async def _next(subscription):
+    return await asyncio.wait_for(subscription.__anext__(), TIMEOUT)
+
+async def _subscribed(feed: OrderFeed, subscription):
+    # Começa a assinatura e espera o feed registrar o maior ID existente
+    pending = asyncio.ensure_future(subscription.__anext__())
+    await asyncio.sleep(0)
+    await asyncio.wait_for(feed._ready.wait(), TIMEOUT)
+    return pending
+
+def test_feed_pushes_each_new_order_once_to_all_screens(feed: OrderFeed, order_data, async_session_factory):
+    user_id, order_in = order_data
+
+    async def scenario():
+        screens = [feed.subscribe() for _ in range(3)]
+        pending = [await _subscribed(feed, screen) for screen in screens]
+        async with async_session_factory() as db:
+            created = await crud_async.create_order(db, order_in, user_id)
+        events = [await asyncio.wait_for(p, TIMEOUT) for p in pending]
+        for screen in screens:
+            await screen.aclose()
+        return created, events
+
+    created, events = asyncio.run(scenario())
+    assert [order_id for order_id, _ in events] == [created.id] * 3
+    # Serializado uma vez só, compartilhado por todas as telas
+    assert events[0][1] is events[1][1] is events[2][1]
+    assert orjson.loads(events[0][1]) == orjson.loads(schemas.OrderRead.model_validate(created).model_dump_json())
+    assert feed._poller is None  # Sem telas, nenhuma tarefa em segundo plano
+
+def test_feed_wakes_up_on_orders_from_sync_routes(feed: OrderFeed, order_data, db_session: Session):
+    user_id, order_in = order_data
+
+    async def scenario():
+        screen = feed.subscribe()
+        pending = await _subscribed(feed, screen)
+        # crud.create_order roda no threadpool nas rotas síncronas (ex.: lote)
+        created = await asyncio.to_thread(crud.create_order, db_session, order_in, user_id)
+        event = await asyncio.wait_for(pending, TIMEOUT)
+        await screen.aclose()
+        return created.id, event
+
+    created_id, (order_id, _) = asyncio.run(scenario())
+    assert order_id == created_id
+
+def test_feed_resumes_after_last_seen_order(feed: OrderFeed, order_data, async_session_factory, db_session: Session):
+    user_id, order_in = order_data
+    before = [crud.create_order(db_session, order_in, user_id).id for _ in range(2)]
+
+    async def scenario():
+        live = feed.subscribe()
+        pending = await _subscribed(feed, live)
+        async with async_session_factory() as db:
+            new_ids = [(await crud_async.create_order(db, order_in, user_id)).id for _ in range(2)]
+        received = [(await asyncio.wait_for(pending, TIMEOUT))[0], (await _next(live))[0]]
+
+        # Último ID ainda no buffer: recebe só o que veio depois, sem consultar o banco
+        from_buffer = feed.subscribe(last_id=new_ids[0])
+        resumed_buffer = [(await _next(from_buffer))[0]]
+        # Último ID anterior ao buffer: uma consulta traz o que faltou, e o feed segue ao vivo
+        from_db = feed.subscribe(last_id=before[0])
+        resumed_db = [(await _next(from_db))[0] for _ in range(3)]
+        async with async_session_factory() as db:
+            newest = (await crud_async.create_order(db, order_in, user_id)).id
+        live_after = [(await _next(subscription))[0] for subscription in (live, from_buffer, from_db)]
+
+        for subscription in (live, from_buffer, from_db):
+            await subscription.aclose()
+        return new_ids, received, resumed_buffer, resumed_db, newest, live_after
+
+    new_ids, received, resumed_buffer, resumed_db, newest, live_after = asyncio.run(scenario())
+    assert received == new_ids
+    assert resumed_buffer == new_ids[1:]
+    assert resumed_db == [before[1]] + new_ids
+    assert live_after == [newest] * 3
+
+def test_feed_asks_for_resync_when_client_missed_too_much(order_data, async_session_factory, db_session: Session, monkeypatch):
+    user_id, order_in = order_data
+    feed = OrderFeed(async_session_factory, poll_seconds=60, buffer_size=2)
+    monkeypatch.setattr(order_feed, "_feed", feed)
+    missed = [crud.create_order(db_session, order_in, user_id).id for _ in range(4)]
+
+    async def scenario():
+        # Três pedidos perdidos, mas o feed só repõe dois: pede para recarregar a listagem
+        screen = feed.subscribe(last_id=missed[0])
+        resync = await _next(screen)
+        async with async_session_factory() as db:
+            newest = (await crud_async.create_order(db, order_in, user_id)).id
+        live = (await _next(screen))[0]
+
+        # Tela lenta: um lote maior que o buffer chega antes de ela consumir os eventos
+        slow = feed.subscribe()
+        pending = await _subscribed(feed, slow)
+        batch = [schemas.BatchOrderCreate(items=order_in.items) for _ in range(3)]
+        await asyncio.to_thread(crud.create_orders_batch, db_session, batch, user_id)
+        slow_resync = await asyncio.wait_for(pending, TIMEOUT)
+        for subscription in (screen, slow):
+            await subscription.aclose()
+        return resync, newest, live, slow_resync
+
+    resync, newest, live, slow_resync = asyncio.run(scenario())
+    assert resync == Resync(last_id=missed[-1])
+    assert live == newest
+    assert slow_resync == Resync(last_id=newest + 3)
+
+def test_sse_stream_format_and_heartbeat(feed: OrderFeed, order_data, db_session: Session):
+    user_id, order_in = order_data
+    created = crud.create_order(db_session, order_in, user_id)
+
+    async def scenario():
+        stream = sse_stream(feed, last_id=0, heartbeat_seconds=0.05)
+        chunks = [await _next(stream) for _ in range(3)]
+        await stream.aclose()
+        return chunks
+
+    retry, event, keepalive = asyncio.run(scenario())
+    assert retry == b"retry: 3000\n\n"
+    header, data = event.split(b"\ndata: ")
+    assert header == f"id: {created.id}\nevent: order".encode()
+    assert orjson.loads(data)["id"] == created.id
+    assert keepalive == b": keepalive\n\n"
+
+def test_sse_stream_resync_event(feed: OrderFeed, order_data, db_session: Session, monkeypatch):
+    user_id, order_in = order_data
+    feed.buffer_size = 1
+    last_ids = [crud.create_order(db_session, order_in, user_id).id for _ in range(3)]
+
+    async def scenario():
+        stream = sse_stream(feed, last_id=last_ids[0], heartbeat_seconds=TIMEOUT)
+        chunks = [await _next(stream) for _ in range(2)]
+        await stream.aclose()
+        return chunks[1]
+
+    assert asyncio.run(scenario()) == f'id: {last_ids[-1]}\nevent: resync\ndata: {{"last_id": {last_ids[-1]}}}\n\n'.encode()
+
+def test_order_feed_requires_admin(client: TestClient, normal_user_auth_headers: dict):
+    assert client.get("/api/v1/orders/feed", headers=normal_user_auth_headers).status_code == 403
+    assert client.get("/api/v1/orders/feed").status_code == 401
+
+def test_order_feed_accepts_token_in_query(client: TestClient, normal_user_auth_headers: dict):
+    # O EventSource do navegador não envia cabeçalhos: o token vai em access_token
+    token = normal_user_auth_headers["Authorization"].removeprefix("Bearer ")
+    assert client.get(f"/api/v1/orders/feed?access_token={token}").status_code == 403
+    assert client.get("/api/v1/orders/feed?access_token=invalido").status_code == 401
+    # Fora do feed, o token continua só no cabeçalho
+    assert client.get(f"/api/v1/orders/?access_token={token}").status_code == 401
@@ -1,7 +1,14 @@
 # tests/test_orders.py
+import asyncio
+
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
-from app import schemas, crud
+from app import models, schemas, crud, crud_async
+from app.group_commit import OrderGroupCommitter, get_order_committer
+from app.main import app
+from app.pagination import encode_cursor
 
 # Vamos reutilizar o teste anterior e expandi-lo
 def test_create_order_success(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
@@ -27,6 +34,34 @@ def test_create_order_product_not_found(client: TestClient, normal_user_auth_hea
     assert response.status_code == 404
     assert "Produto com ID 999 não encontrado" in response.json()["detail"]
 
+def test_create_order_reports_all_missing_products(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="T010", product_name="Pão Existente", unit="UN", price=1.0))
+    order_data = {"items": [
+        {"product_id": 999, "quantity": 1},
+        {"product_id": product.id, "quantity": 1},
+        {"product_id": 998, "quantity": 2},
+    ]}
+    response = client.post("/api/v1/orders/", json=order_data, headers=normal_user_auth_headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Produtos com IDs 998, 999 não encontrados."
+
+def test_create_order_product_lookup_is_single_query(db_session: Session, query_counter: list):
+    # O número de consultas para criar um pedido não pode crescer com o número de itens
+    user = crud.create_user(db_session, schemas.UserCreate(username="bulkuser", email="bulk@test.com", password="password"))
+    product_ids = [
+        crud.create_product(db_session, schemas.ProductCreate(code=f"B{i:03d}", product_name=f"Produto {i}", unit="UN", price=1.0)).id
+        for i in range(30)
+    ]
+
+    def count_queries_for(n_items: int) -> int:
+        order_in = schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product_id, quantity=1) for product_id in product_ids[:n_items]])
+        query_counter.clear()
+        crud.create_order(db_session, order_in=order_in, user_id=user.id)
+        return len([s for s in query_counter if s.lstrip().upper().startswith("SELECT")])
+
+    assert count_queries_for(1) == count_queries_for(30)
+
 def test_user_can_only_see_own_orders(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
     # Cria um pedido para o usuário normal
     product = crud.create_product(db_session, schemas.ProductCreate(code="T002", product_name="Bolo Teste", unit="UN", price=15.0))
@@ -66,4 +101,246 @@ def test_user_cannot_see_others_order(client: TestClient, db_session: Session, a
     response = client.get(f"/api/v1/orders/{admin_order_id}", headers=normal_user_auth_headers)
     
     assert response.status_code == 403
-    assert "Permissão insuficiente" in response.json()["detail"]
\ No newline at end of file
+    assert "Permissão insuficiente" in response.json()["detail"]
+
+def test_list_orders_query_count_is_constant(client: TestClient, db_session: Session, admin_auth_headers: dict, query_counter: list):
+    # Itens e produtos são carregados antecipadamente: a listagem não pode fazer uma consulta por pedido
+    user = crud.create_user(db_session, schemas.UserCreate(username="listuser", email="list@test.com", password="password"))
+    product_ids = [
+        crud.create_product(db_session, schemas.ProductCreate(code=f"L{i:03d}", product_name=f"Produto {i}", unit="UN", price=2.0)).id
+        for i in range(5)
+    ]
+
+    def count_queries_for_listing() -> int:
+        query_counter.clear()
+        response = client.get("/api/v1/orders/", headers=admin_auth_headers)
+        assert response.status_code == 200
+        return len(query_counter)
+
+    crud.create_order(db_session, schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product_ids[0], quantity=1)]), user_id=user.id)
+    count_queries_for_listing()  # Aquece o cache de autenticação
+    queries_with_one_order = count_queries_for_listing()
+
+    for _ in range(10):
+        items = [schemas.OrderItemCreate(product_id=product_id, quantity=2) for product_id in product_ids]
+        crud.create_order(db_session, schemas.OrderCreate(items=items), user_id=user.id)
+    db_session.expire_all()
+
+    assert count_queries_for_listing() == queries_with_one_order
+
+
+def test_list_orders_cursor_pagination(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    # Vários pedidos criados no mesmo segundo: o desempate por ID não pode repetir nem pular pedidos
+    product = crud.create_product(db_session, schemas.ProductCreate(code="K001", product_name="Pão Cursor", unit="UN", price=1.0))
+    created_ids = []
+    for _ in range(5):
+        response = client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 1}]}, headers=normal_user_auth_headers)
+        created_ids.append(response.json()["id"])
+
+    seen_ids = []
+    response = client.get("/api/v1/orders/?limit=2", headers=normal_user_auth_headers)
+    while True:
+        assert response.status_code == 200
+        seen_ids += [o["id"] for o in response.json()]
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get(f"/api/v1/orders/?limit=2&cursor={next_cursor}", headers=normal_user_auth_headers)
+
+    assert seen_ids == sorted(created_ids, reverse=True)
+
+def test_list_orders_cursor_of_deleted_order_is_rejected(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    # Sem o pedido de referência não há como saber a posição: 400 em vez de uma página vazia
+    product = crud.create_product(db_session, schemas.ProductCreate(code="K002", product_name="Pão Removido", unit="UN", price=1.0))
+    order_ids = [
+        client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 1}]}, headers=normal_user_auth_headers).json()["id"]
+        for _ in range(2)
+    ]
+
+    # O cursor do último pedido de uma página válida continua respondendo 200 vazio
+    response = client.get(f"/api/v1/orders/?cursor={encode_cursor(min(order_ids))}", headers=normal_user_auth_headers)
+    assert response.status_code == 200
+    assert response.json() == []
+
+    db_session.query(models.OrderItem).filter(models.OrderItem.order_id == max(order_ids)).delete()
+    db_session.query(models.Order).filter(models.Order.id == max(order_ids)).delete()
+    db_session.commit()
+    response = client.get(f"/api/v1/orders/?cursor={encode_cursor(max(order_ids))}", headers=normal_user_auth_headers)
+    assert response.status_code == 400
+
+def test_list_orders_matches_order_schema(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    # A listagem monta o JSON direto das colunas: deve ser idêntica à serialização via schemas.OrderRead
+    products = [
+        crud.create_product(db_session, schemas.ProductCreate(code=f"J{i:03d}", product_name=f"Pão Json {i}", unit="UN", price=1.25 * (i + 1)))
+        for i in range(3)
+    ]
+    items = [{"product_id": product.id, "quantity": i + 1} for i, product in enumerate(products)]
+    order_id = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers).json()["id"]
+
+    listed = client.get("/api/v1/orders/", headers=normal_user_auth_headers).json()
+    detail = client.get(f"/api/v1/orders/{order_id}", headers=normal_user_auth_headers).json()
+    assert listed == [detail]
+    assert schemas.OrderRead.model_validate(listed[0]).model_dump(mode="json") == detail
+
+def test_list_orders_summary(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    # O histórico traz só totais e a quantidade de itens; os itens ficam no detalhe
+    product = crud.create_product(db_session, schemas.ProductCreate(code="R001", product_name="Pão Resumo", unit="UN", price=2.5))
+    items = [{"product_id": product.id, "quantity": 2}, {"product_id": product.id, "quantity": 1}]
+    order_id = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers).json()["id"]
+
+    listed = client.get("/api/v1/orders/?view=summary", headers=normal_user_auth_headers).json()
+    detail = client.get(f"/api/v1/orders/{order_id}", headers=normal_user_auth_headers).json()
+    summary = {key: detail[key] for key in ("id", "user_id", "total_amount", "created_at")}
+    assert listed == [{**summary, "item_count": 2}]
+    assert schemas.OrderSummary.model_validate(listed[0]).model_dump(mode="json") == listed[0]
+    assert client.get("/api/v1/orders/?view=items", headers=normal_user_auth_headers).status_code == 422
+
+@pytest.mark.parametrize("user_id", [None, 1])
+@pytest.mark.parametrize("after_id", [None, 1])
+def test_order_summary_page_is_index_only(db_session: Session, user_id, after_id):
+    # Ordem, filtro e colunas do resumo saem dos índices de cobertura, sem ler a tabela nem ordenar
+    query = select(*crud_async.ORDER_ROW_COLUMNS, crud_async.ORDER_ITEM_COUNT)
+    if user_id is not None:
+        query = query.where(models.Order.user_id == user_id)
+    sql = crud.paginate_orders(query, 0, 20, after_id).compile(db_session.bind, compile_kwargs={"literal_binds": True})
+    plan = [row[-1] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    index = "ix_orders_created_at_desc" if user_id is None else "ix_orders_user_id_created_at_desc"
+    assert any(f"orders USING COVERING INDEX {index}" in step for step in plan)
+    assert any("order_items USING COVERING INDEX ix_order_items_order_id" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan)
+
+def test_create_orders_batch(client: TestClient, db_session: Session, admin_auth_headers: dict, normal_user_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="LOTE1", product_name="Pão Lote", unit="UN", price=2.0))
+    user = crud.get_user_by_username(db_session, username="testuser")
+    batch = {"orders": [
+        {"items": [{"product_id": product.id, "quantity": 3}]},
+        {"user_id": user.id, "items": [{"product_id": 999, "quantity": 1}]},
+        {"user_id": user.id, "items": [{"product_id": product.id, "quantity": 1}, {"product_id": product.id, "quantity": 2}]},
+        {"user_id": 12345, "items": [{"product_id": product.id, "quantity": 1}]},
+    ]}
+
+    response = client.post("/api/v1/orders/batch", json=batch, headers=admin_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 2)
+    assert [r["success"] for r in data["results"]] == [True, False, True, False]
+    assert data["results"][1]["error"] == "Produto com ID 999 não encontrado."
+    assert data["results"][3]["error"] == "Usuário com ID 12345 não encontrado."
+
+    # O pedido do lote é um pedido normal do usuário, com itens e total corretos
+    user_orders = client.get("/api/v1/orders/", headers=normal_user_auth_headers).json()
+    assert [o["id"] for o in user_orders] == [data["results"][2]["order_id"]]
+    assert user_orders[0]["total_amount"] == 6.0
+    assert len(user_orders[0]["items"]) == 2
+
+def test_create_orders_batch_statement_count_is_constant(client: TestClient, db_session: Session, admin_auth_headers: dict, query_counter: list):
+    product_id = crud.create_product(db_session, schemas.ProductCreate(code="LOTE2", product_name="Bolo Lote", unit="UN", price=5.0)).id
+    client.get("/api/v1/orders/", headers=admin_auth_headers)  # Aquece o cache de autenticação
+
+    def count_statements_for(n_orders: int) -> int:
+        query_counter.clear()
+        batch = {"orders": [{"items": [{"product_id": product_id, "quantity": 1}] * 3} for _ in range(n_orders)]}
+        response = client.post("/api/v1/orders/batch", json=batch, headers=admin_auth_headers)
+        assert response.json()["created"] == n_orders
+        # RETURNING na ordem dos parâmetros: o SQLite não tem sentinela implícita e recebe um
+        # INSERT de pedido por linha; no Postgres é um INSERT só. As demais instruções não crescem.
+        assert len([s for s in query_counter if s.startswith("INSERT INTO orders")]) == n_orders
+        return len([s for s in query_counter if not s.startswith("INSERT INTO orders")])
+
+    assert count_statements_for(2) == count_statements_for(20)
+
+def test_create_orders_batch_as_user_is_forbidden(client: TestClient, normal_user_auth_headers: dict):
+    response = client.post("/api/v1/orders/batch", json={"orders": [{"items": []}]}, headers=normal_user_auth_headers)
+    assert response.status_code == 403
+
+def _group_commit_fixture_data(db_session: Session):
+    user = crud.create_user(db_session, schemas.UserCreate(username="groupuser", email="group@test.com", password="password"))
+    products = [crud.create_product(db_session, schemas.ProductCreate(code=f"GC{i}", product_name=f"Pão Grupo {i}", unit="UN", price=1.5 * (i + 1))) for i in range(3)]
+    return user.id, [product.id for product in products]
+
+def test_group_commit_writes_concurrent_orders_in_one_transaction(db_session: Session, async_session_factory, query_counter: list):
+    user_id, product_ids = _group_commit_fixture_data(db_session)
+    committer = OrderGroupCommitter(async_session_factory, window_ms=50, max_orders=100)
+    orders_in = [schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product_ids[i % 3], quantity=i + 1)]) for i in range(8)]
+    orders_in.insert(3, schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=999, quantity=1)]))
+
+    async def submit_all():
+        return await asyncio.gather(*(committer.submit(order_in, user_id) for order_in in orders_in), return_exceptions=True)
+
+    query_counter.clear()
+    results = asyncio.run(submit_all())
+
+    # O pedido inválido falha sozinho, com o mesmo erro do caminho normal
+    assert isinstance(results[3], ValueError)
+    assert str(results[3]) == "Produto com ID 999 não encontrado."
+    created = [schemas.OrderRead.model_validate(order) for order in results[:3] + results[4:]]
+    assert [order.total_amount for order in created] == [1.5 * (i % 3 + 1) * (i + 1) for i in range(8)]
+    assert all(order.user_id == user_id and len(order.items) == 1 and order.items[0].id for order in created)
+    assert len({order.id for order in created}) == 8
+
+    # Um único INSERT de itens para o grupo (os pedidos saem um por linha no SQLite, ver acima)
+    assert len([s for s in query_counter if s.startswith("INSERT INTO order_items")]) == 1
+    assert len(crud.get_orders_by_user(db_session, user_id)) == 8
+
+def test_group_commit_retries_orders_individually_when_group_fails(db_session: Session, async_session_factory, monkeypatch):
+    user_id, product_ids = _group_commit_fixture_data(db_session)
+    original = crud_async.write_orders_group
+
+    async def fail_for_groups(db, orders_in):
+        if len(orders_in) > 1:
+            raise RuntimeError("falha no commit do grupo")
+        return await original(db, orders_in)
+
+    monkeypatch.setattr(crud_async, "write_orders_group", fail_for_groups)
+    committer = OrderGroupCommitter(async_session_factory, window_ms=50)
+    orders_in = [schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product_id, quantity=1)]) for product_id in product_ids]
+
+    async def submit_all():
+        return await asyncio.gather(*(committer.submit(order_in, user_id) for order_in in orders_in))
+
+    results = asyncio.run(submit_all())
+    assert sorted(order.items[0].product_id for order in results) == sorted(product_ids)
+    assert len(crud.get_orders_by_user(db_session, user_id)) == 3
+
+@pytest.mark.parametrize("failed_loads", [1, 2])
+def test_group_commit_never_rewrites_committed_orders(db_session: Session, async_session_factory, monkeypatch, failed_loads):
+    # Falha depois do commit: o grupo já está gravado e não pode ser regravado pedido a pedido
+    user_id, product_ids = _group_commit_fixture_data(db_session)
+    original = crud_async.get_orders_by_ids
+    calls = []
+
+    async def fail_after_commit(db, order_ids):
+        calls.append(order_ids)
+        if len(calls) <= failed_loads:
+            raise RuntimeError("falha ao recarregar o grupo")
+        return await original(db, order_ids)
+
+    monkeypatch.setattr(crud_async, "get_orders_by_ids", fail_after_commit)
+    committer = OrderGroupCommitter(async_session_factory, window_ms=50)
+    orders_in = [schemas.OrderCreate(items=[schemas.OrderItemCreate(product_id=product_id, quantity=1)]) for product_id in product_ids]
+
+    async def submit_all():
+        return await asyncio.gather(*(committer.submit(order_in, user_id) for order_in in orders_in), return_exceptions=True)
+
+    results = asyncio.run(submit_all())
+    if failed_loads == 1:
+        # A segunda tentativa de recarga (em outra sessão) entrega os pedidos
+        assert sorted(order.items[0].product_id for order in results) == sorted(product_ids)
+    else:
+        assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(crud.get_orders_by_user(db_session, user_id)) == 3
+
+def test_create_order_with_group_commit_enabled(client: TestClient, db_session: Session, normal_user_auth_headers: dict, async_session_factory):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="GCAPI", product_name="Pão Grupo API", unit="UN", price=2.0))
+    app.dependency_overrides[get_order_committer] = lambda: OrderGroupCommitter(async_session_factory, window_ms=1)
+    try:
+        response = client.post("/api/v1/orders/", json={"items": [{"product_id": product.id, "quantity": 3}]}, headers=normal_user_auth_headers)
+        missing = client.post("/api/v1/orders/", json={"items": [{"product_id": 999, "quantity": 1}]}, headers=normal_user_auth_headers)
+    finally:
+        del app.dependency_overrides[get_order_committer]
+
+    assert response.status_code == 201
+    assert response.json() == client.get(f"/api/v1/orders/{response.json()['id']}", headers=normal_user_auth_headers).json()
+    assert response.json()["total_amount"] == 6.0
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == "Produto com ID 999 não encontrado."
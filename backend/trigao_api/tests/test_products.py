@@ -1,7 +1,8 @@
 # tests/test_products.py
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from app import schemas
+from app import schemas, crud
+from app.pagination import encode_cursor
 
 def test_create_product_as_admin(client: TestClient, admin_auth_headers: dict):
     product_data = {"code": "P123", "product_name": "Bolo de Chocolate", "unit": "UN", "price": 50.0}
@@ -46,4 +47,135 @@ def test_delete_product_as_admin(client: TestClient, db_session: Session, admin_
     # Verifica se o produto foi realmente deletado
     response = client.get(f"/api/v1/products/", headers=admin_auth_headers)
     product_ids = [p["id"] for p in response.json()]
-    assert product_id not in product_ids
\ No newline at end of file
+    assert product_id not in product_ids
+
+def test_read_products_cursor_pagination(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    for i in range(5):
+        crud.create_product(db_session, schemas.ProductCreate(code=f"C{i}", product_name=f"Produto {i}", unit="UN", price=1.0))
+
+    seen_ids = []
+    response = client.get("/api/v1/products/?limit=2", headers=normal_user_auth_headers)
+    while True:
+        assert response.status_code == 200
+        seen_ids += [p["id"] for p in response.json()]
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get(f"/api/v1/products/?limit=2&cursor={next_cursor}", headers=normal_user_auth_headers)
+
+    assert len(seen_ids) == 5
+    assert seen_ids == sorted(set(seen_ids))
+
+def test_read_products_invalid_cursor(client: TestClient, normal_user_auth_headers: dict):
+    response = client.get("/api/v1/products/?cursor=nao-e-um-cursor", headers=normal_user_auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor inválido"
+
+    # Um ID que decodifica mas não cabe em 64 bits também é 400, não um erro do driver
+    for last_id in (2 ** 63, -(2 ** 63) - 1, 10 ** 30):
+        for route in ("/api/v1/products/", "/api/v1/orders/"):
+            response = client.get(f"{route}?cursor={encode_cursor(last_id)}", headers=normal_user_auth_headers)
+            assert response.status_code == 400
+            assert response.json()["detail"] == "Cursor inválido"
+
+
+def test_read_products_etag_not_modified(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    crud.create_product(db_session, schemas.ProductCreate(code="E1", product_name="Pão ETag", unit="UN", price=1.0))
+    response = client.get("/api/v1/products/", headers=normal_user_auth_headers)
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/v1/products/", headers={**normal_user_auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Qualquer alteração no catálogo muda a versão e invalida a ETag
+    crud.create_product(db_session, schemas.ProductCreate(code="E2", product_name="Bolo ETag", unit="UN", price=2.0))
+    response = client.get("/api/v1/products/", headers={**normal_user_auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+def test_read_catalog_changes(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    kept = crud.create_product(db_session, schemas.ProductCreate(code="D1", product_name="Pão Mantido", unit="UN", price=1.0))
+    removed = crud.create_product(db_session, schemas.ProductCreate(code="D2", product_name="Pão Removido", unit="UN", price=1.0))
+    since = int(client.get("/api/v1/products/", headers=admin_auth_headers).headers["X-Catalog-Version"])
+
+    client.put(f"/api/v1/products/{kept.id}", json={"code": "D1", "product_name": "Pão Mantido", "unit": "UN", "price": 1.5}, headers=admin_auth_headers)
+    added = client.post("/api/v1/products/", json={"code": "D3", "product_name": "Pão Novo", "unit": "UN", "price": 3.0}, headers=admin_auth_headers).json()
+    client.delete(f"/api/v1/products/{removed.id}", headers=admin_auth_headers)
+
+    response = client.get(f"/api/v1/products/changes?since={since}", headers=admin_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["version"] == since + 3
+    assert {p["id"]: p["price"] for p in data["updated"]} == {kept.id: 1.5, added["id"]: 3.0}
+    assert data["deleted_ids"] == [removed.id]
+
+    response = client.get(f"/api/v1/products/changes?since={data['version']}", headers=admin_auth_headers)
+    assert response.json() == {"version": data["version"], "updated": [], "deleted_ids": []}
+
+def test_search_products(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    for code, name, section in [
+        ("S1", "BAGUETE KG", "1"),
+        ("S2", "MINI BAGUETE", "1"),
+        ("S3", "PAO BAHIA", "1"),
+        ("S4", "SALGADO BAGUETINHO", "2"),
+        ("S5", "Pão de Açúcar", "2"),
+    ]:
+        crud.create_product(db_session, schemas.ProductCreate(code=code, product_name=name, unit="UN", price=1.0, section=section))
+
+    response = client.get("/api/v1/products/search?q=baguete", headers=normal_user_auth_headers)
+    assert response.status_code == 200
+    # Início do nome antes de início de palavra, e este antes de trecho
+    assert [p["product_name"] for p in response.json()] == ["BAGUETE KG", "MINI BAGUETE"]
+
+    response = client.get("/api/v1/products/search?q=bague", headers=normal_user_auth_headers)
+    assert [p["code"] for p in response.json()] == ["S1", "S2", "S4"]
+    assert response.headers["X-Total-Count"] == "3"
+
+    # Sem diferenciar acentos
+    response = client.get("/api/v1/products/search?q=pão", headers=normal_user_auth_headers)
+    assert [p["code"] for p in response.json()] == ["S3", "S5"]
+    response = client.get("/api/v1/products/search?q=acucar", headers=normal_user_auth_headers)
+    assert [p["code"] for p in response.json()] == ["S5"]
+
+    response = client.get("/api/v1/products/search?q=bague&section=2", headers=normal_user_auth_headers)
+    assert [p["code"] for p in response.json()] == ["S4"]
+
+    response = client.get("/api/v1/products/search?q=bague&limit=1&skip=1", headers=normal_user_auth_headers)
+    assert [p["code"] for p in response.json()] == ["S2"]
+
+    # Fatias inválidas (skip negativo, limit nulo ou grande demais) são recusadas
+    for params in ("skip=-1", "limit=0", "limit=-5", "limit=100000"):
+        response = client.get(f"/api/v1/products/search?q=bague&{params}", headers=normal_user_auth_headers)
+        assert response.status_code == 422
+
+def test_search_index_follows_catalog_changes(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    assert client.get("/api/v1/products/search?q=sonho", headers=normal_user_auth_headers).json() == []
+    crud.create_product(db_session, schemas.ProductCreate(code="S9", product_name="SONHO DE CREME", unit="UN", price=4.0))
+    assert [p["code"] for p in client.get("/api/v1/products/search?q=sonho", headers=normal_user_auth_headers).json()] == ["S9"]
+
+def test_read_catalog_snapshot_encodings(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    crud.create_product(db_session, schemas.ProductCreate(code="S1", product_name="Pão Snapshot", unit="UN", price=1.0))
+    expected = client.get("/api/v1/products/", headers=normal_user_auth_headers).json()
+
+    for accept, encoding in [("br, gzip", "br"), ("gzip", "gzip"), ("br;q=0, gzip;q=0.5", "gzip"), ("identity", None)]:
+        response = client.get("/api/v1/products/catalog", headers={**normal_user_auth_headers, "Accept-Encoding": accept})
+        assert response.status_code == 200
+        assert response.headers.get("Content-Encoding") == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.json() == expected
+
+def test_read_catalog_snapshot_follows_catalog_changes(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="S2", product_name="Pão Antigo", unit="UN", price=1.0))
+    response = client.get("/api/v1/products/catalog", headers=admin_auth_headers)
+    etag = response.headers["ETag"]
+    assert client.get("/api/v1/products/catalog", headers={**admin_auth_headers, "If-None-Match": etag}).status_code == 304
+
+    crud.update_product(db_session, product.id, schemas.ProductCreate(code="S2", product_name="Pão Novo", unit="UN", price=2.0))
+    response = client.get("/api/v1/products/catalog", headers={**admin_auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [(p["product_name"], p["price"]) for p in response.json()] == [("Pão Novo", 2.0)]
+
+    crud.delete_product(db_session, product.id)
+    assert client.get("/api/v1/products/catalog", headers=admin_auth_headers).json() == []
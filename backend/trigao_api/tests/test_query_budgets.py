@@ -0,0 +1,77 @@
+# tests/test_query_budgets.py
+# Orçamentos de consultas SQL dos endpoints mais acessados. Os limites não dependem do
+# volume (itens por pedido, pedidos listados, produtos no catálogo): um N+1 os estoura.
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import schemas, crud
+from app.auth import clear_auth_caches
+
+# Instruções por requisição, com o cache de autenticação já aquecido
+QUERY_BUDGETS = {
+    "auth_overhead_cold": 1,   # usuário do token, carregado uma vez e mantido em cache
+    "auth_overhead_warm": 0,
+    "order_create": 7,         # produtos, consolidado, pedido, itens (executemany) e releitura com itens e produtos
+    "order_list": 2,           # página de pedidos + itens com produtos
+    "order_detail": 3,         # pedido, itens, produtos (selectinload)
+    "catalog_list": 2,         # versão do catálogo + página de produtos
+    "catalog_snapshot": 1,     # só a versão do catálogo (o corpo vem da memória)
+    "catalog_search": 1,       # só a versão do catálogo (o índice vem da memória)
+}
+
+def _create_products(db_session: Session, n: int, prefix: str):
+    return [
+        crud.create_product(db_session, schemas.ProductCreate(code=f"{prefix}{i:03d}", product_name=f"Produto {prefix}{i}", unit="UN", price=1.0 + i)).id
+        for i in range(n)
+    ]
+
+def _warm_auth(client: TestClient, headers: dict):
+    assert client.get("/api/v1/products/catalog", headers=headers).status_code == 200
+
+def test_authenticated_request_overhead(client: TestClient, normal_user_auth_headers: dict, query_budget):
+    _warm_auth(client, normal_user_auth_headers)  # também monta o snapshot do catálogo
+    with query_budget(QUERY_BUDGETS["catalog_snapshot"] + QUERY_BUDGETS["auth_overhead_warm"], "requisição autenticada (cache quente)"):
+        client.get("/api/v1/products/catalog", headers=normal_user_auth_headers)
+
+    clear_auth_caches()
+    with query_budget(QUERY_BUDGETS["catalog_snapshot"] + QUERY_BUDGETS["auth_overhead_cold"], "requisição autenticada (cache frio)"):
+        client.get("/api/v1/products/catalog", headers=normal_user_auth_headers)
+
+@pytest.mark.parametrize("n_items", [1, 25])
+def test_order_create_budget(client: TestClient, db_session: Session, normal_user_auth_headers: dict, query_budget, n_items: int):
+    product_ids = _create_products(db_session, n_items, "QC")
+    _warm_auth(client, normal_user_auth_headers)
+    items = [{"product_id": product_id, "quantity": 2} for product_id in product_ids]
+    with query_budget(QUERY_BUDGETS["order_create"], f"criação de pedido com {n_items} itens"):
+        response = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers)
+    assert response.status_code == 201
+
+@pytest.mark.parametrize("n_orders", [1, 30])
+def test_order_list_budget(client: TestClient, db_session: Session, normal_user_auth_headers: dict, query_budget, n_orders: int):
+    product_ids = _create_products(db_session, 3, "QL")
+    items = [{"product_id": product_id, "quantity": 1} for product_id in product_ids]
+    for _ in range(n_orders):
+        order_id = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers).json()["id"]
+
+    with query_budget(QUERY_BUDGETS["order_list"], f"listagem de {n_orders} pedidos"):
+        response = client.get("/api/v1/orders/", headers=normal_user_auth_headers)
+    assert len(response.json()) == n_orders
+
+    with query_budget(QUERY_BUDGETS["order_detail"], "detalhe de pedido"):
+        assert client.get(f"/api/v1/orders/{order_id}", headers=normal_user_auth_headers).status_code == 200
+
+@pytest.mark.parametrize("n_products", [1, 60])
+def test_catalog_budget(client: TestClient, db_session: Session, normal_user_auth_headers: dict, query_budget, n_products: int):
+    _create_products(db_session, n_products, "QP")
+    _warm_auth(client, normal_user_auth_headers)
+
+    with query_budget(QUERY_BUDGETS["catalog_list"], f"listagem do catálogo com {n_products} produtos"):
+        response = client.get("/api/v1/products/", headers=normal_user_auth_headers)
+    assert len(response.json()) == n_products
+
+    with query_budget(QUERY_BUDGETS["catalog_snapshot"], "snapshot do catálogo"):
+        client.get("/api/v1/products/catalog", headers=normal_user_auth_headers)
+
+    client.get("/api/v1/products/search?q=produto", headers=normal_user_auth_headers)  # monta o índice
+    with query_budget(QUERY_BUDGETS["catalog_search"], "busca no catálogo"):
+        client.get("/api/v1/products/search?q=produto", headers=normal_user_auth_headers)
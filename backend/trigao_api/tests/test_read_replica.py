@@ -0,0 +1,101 @@
+# tests/test_read_replica.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import auth, crud, schemas
+from app.auth import get_async_replica_db, get_read_db
+from app.database import Base
+from app.main import app
+
+@pytest.fixture
+def replica(client: TestClient, db_session: Session, tmp_path):
+    """
+    Segundo arquivo SQLite fazendo o papel da réplica. A "replicação" só acontece quando
+    o teste chama replica(): até lá, as leituras da réplica ficam atrasadas.
+    """
+    url = tmp_path / "replica.db"
+    replica_engine = create_engine(f"sqlite:///{url}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=replica_engine)
+    ReplicaSession = sessionmaker(bind=replica_engine)
+    AsyncReplicaSession = async_sessionmaker(bind=create_async_engine(f"sqlite+aiosqlite:///{url}", poolclass=NullPool), expire_on_commit=False)
+
+    def override_get_read_db():
+        db = ReplicaSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_replica_db():
+        async with AsyncReplicaSession() as session:
+            yield session
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_async_replica_db] = override_get_async_replica_db
+
+    def replicate():
+        db_session.commit()
+        with replica_engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+            for table in Base.metadata.sorted_tables:
+                rows = [row._asdict() for row in db_session.execute(select(table))]
+                if rows:
+                    conn.execute(insert(table), rows)
+
+    yield replicate
+    replica_engine.dispose()
+
+def _order_payload(db_session: Session):
+    product = crud.create_product(db_session, schemas.ProductCreate(code="REP1", product_name="Pão Réplica", unit="UN", price=2.5))
+    return {"items": [{"product_id": product.id, "quantity": 2}]}
+
+def test_listings_read_from_replica(client: TestClient, db_session: Session, normal_user_auth_headers: dict, replica):
+    payload = _order_payload(db_session)
+    user_id = crud.get_user_by_username(db_session, "testuser").id
+    crud.create_order(db_session, schemas.OrderCreate(**payload), user_id=user_id)
+
+    # Gravado no principal, ainda não replicado
+    assert client.get("/api/v1/orders/", headers=normal_user_auth_headers).json() == []
+    assert client.get("/api/v1/products/", headers=normal_user_auth_headers).json() == []
+
+    replica()
+    assert len(client.get("/api/v1/orders/", headers=normal_user_auth_headers).json()) == 1
+    assert [p["code"] for p in client.get("/api/v1/products/", headers=normal_user_auth_headers).json()] == ["REP1"]
+
+def test_read_your_writes_after_placing_an_order(client: TestClient, db_session: Session, normal_user_auth_headers: dict, admin_auth_headers: dict, replica):
+    payload = _order_payload(db_session)
+    replica()
+    created = client.post("/api/v1/orders/", json=payload, headers=normal_user_auth_headers).json()
+
+    # Quem acabou de gravar lê do principal; os demais continuam na réplica
+    assert [o["id"] for o in client.get("/api/v1/orders/", headers=normal_user_auth_headers).json()] == [created["id"]]
+    assert client.get("/api/v1/orders/", headers=admin_auth_headers).json() == []
+
+    # Passada a janela, o usuário volta para a réplica
+    auth.recent_writers.clear()
+    assert client.get("/api/v1/orders/", headers=normal_user_auth_headers).json() == []
+
+def test_single_order_falls_back_to_primary(client: TestClient, db_session: Session, normal_user_auth_headers: dict, replica):
+    payload = _order_payload(db_session)
+    replica()
+    created = client.post("/api/v1/orders/", json=payload, headers=normal_user_auth_headers).json()
+    # Simula uma requisição atendida por outro worker, que não viu a gravação
+    auth.recent_writers.clear()
+
+    response = client.get(f"/api/v1/orders/{created['id']}", headers=normal_user_auth_headers)
+    assert response.status_code == 200
+    assert response.json() == created
+    assert client.get("/api/v1/orders/999", headers=normal_user_auth_headers).status_code == 404
+
+def test_reports_read_from_replica(client: TestClient, db_session: Session, normal_user_auth_headers: dict, admin_auth_headers: dict, replica):
+    payload = _order_payload(db_session)
+    client.post("/api/v1/orders/", json=payload, headers=normal_user_auth_headers)
+    assert client.get("/api/v1/reports/sales/daily", headers=admin_auth_headers).json() == []
+
+    replica()
+    assert [day["quantity"] for day in client.get("/api/v1/reports/sales/daily", headers=admin_auth_headers).json()] == [2]
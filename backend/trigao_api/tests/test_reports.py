@@ -0,0 +1,63 @@
+# tests/test_reports.py
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import schemas, crud, models, reports
+
+def _create_sales(client: TestClient, db_session: Session, headers: dict):
+    bread = crud.create_product(db_session, schemas.ProductCreate(code="RP1", product_name="BAGUETE KG", unit="UN", price=2.5, section="1"))
+    cake = crud.create_product(db_session, schemas.ProductCreate(code="RP2", product_name="BOLO", unit="UN", price=10.0, section="2"))
+    bread_id, cake_id = bread.id, cake.id
+    client.post("/api/v1/orders/", json={"items": [{"product_id": bread_id, "quantity": 4}, {"product_id": bread_id, "quantity": 2}]}, headers=headers)
+    client.post("/api/v1/orders/", json={"items": [{"product_id": bread_id, "quantity": 1}, {"product_id": cake_id, "quantity": 1}]}, headers=headers)
+    client.post("/api/v1/orders/batch", json={"orders": [{"items": [{"product_id": cake_id, "quantity": 2}]}]}, headers=headers)
+    return bread_id, cake_id
+
+def test_sales_reports_follow_new_orders(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    bread_id, cake_id = _create_sales(client, db_session, admin_auth_headers)
+
+    daily = client.get("/api/v1/reports/sales/daily", headers=admin_auth_headers).json()
+    assert len(daily) == 1
+    assert (daily[0]["quantity"], daily[0]["revenue"]) == (10, 47.5)
+
+    products = client.get("/api/v1/reports/sales/products", headers=admin_auth_headers).json()
+    assert [(p["product_id"], p["quantity"], p["revenue"], p["order_count"]) for p in products] == [
+        (cake_id, 3, 30.0, 2),
+        (bread_id, 7, 17.5, 2),  # Duas linhas do mesmo produto no pedido contam como um pedido
+    ]
+
+    sections = client.get("/api/v1/reports/sales/sections", headers=admin_auth_headers).json()
+    assert [(s["section"], s["revenue"]) for s in sections] == [("2", 30.0), ("1", 17.5)]
+
+    filtered = client.get("/api/v1/reports/sales/products?section=1", headers=admin_auth_headers).json()
+    assert [p["product_id"] for p in filtered] == [bread_id]
+
+def test_rebuild_daily_sales_matches_incremental_rollup(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    _create_sales(client, db_session, admin_auth_headers)
+    incremental = reports.get_sales_by_product(db_session)
+
+    db_session.query(models.DailySales).delete()
+    db_session.commit()
+    assert reports.get_sales_by_product(db_session) == []
+
+    assert reports.rebuild_daily_sales(db_session) == 2
+    assert reports.get_sales_by_product(db_session) == incremental
+
+def test_rebuild_daily_sales_keeps_section_at_sale_time(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    bread_id, _ = _create_sales(client, db_session, admin_auth_headers)
+    # O produto muda de seção depois das vendas (e vende de novo no mesmo dia)
+    crud.update_product(db_session, bread_id, schemas.ProductCreate(code="RP1", product_name="BAGUETE KG", unit="UN", price=2.5, section="3"))
+    client.post("/api/v1/orders/", json={"items": [{"product_id": bread_id, "quantity": 1}]}, headers=admin_auth_headers)
+    incremental = reports.get_sales_by_section(db_session)
+    assert [(s["section"], s["revenue"]) for s in incremental] == [("2", 30.0), ("1", 20.0)]
+
+    assert reports.rebuild_daily_sales(db_session) == 2
+    assert reports.get_sales_by_section(db_session) == incremental
+
+def test_sales_by_product_limit_is_validated(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    for limit in (0, -1, 100000):
+        response = client.get(f"/api/v1/reports/sales/products?limit={limit}", headers=admin_auth_headers)
+        assert response.status_code == 422
+
+def test_sales_reports_as_user_is_forbidden(client: TestClient, normal_user_auth_headers: dict):
+    response = client.get("/api/v1/reports/sales/daily", headers=normal_user_auth_headers)
+    assert response.status_code == 403
@@ -0,0 +1,158 @@
+# tests/test_stock.py
+import asyncio
+import random
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import crud, crud_async, models, schemas
+
+def _product(db_session: Session, code: str, name: str, stock=None, price: float = 20.0) -> models.Product:
+    product = crud.create_product(db_session, schemas.ProductCreate(code=code, product_name=name, unit="KG", price=price))
+    return crud.set_product_stock(db_session, product.id, stock) if stock is not None else product
+
+def _stock(db_session: Session, product_id: int):
+    db_session.expire_all()
+    return crud.get_product(db_session, product_id).stock
+
+def test_order_reserves_stock(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    baguete = _product(db_session, "1088", "BAGUETE KG", stock=10)
+    free = _product(db_session, "1302", "FARINHA DE ROSCA KG")
+    items = [{"product_id": baguete.id, "quantity": 3}, {"product_id": free.id, "quantity": 100}, {"product_id": baguete.id, "quantity": 1}]
+
+    response = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers)
+    assert response.status_code == 201
+    assert _stock(db_session, baguete.id) == 6
+    assert _stock(db_session, free.id) is None  # Sem controle de estoque: venda livre
+
+def test_order_with_insufficient_stock_is_rejected(client: TestClient, db_session: Session, normal_user_auth_headers: dict):
+    bolo = _product(db_session, "2001", "BOLO DE CENOURA", stock=5)
+    baguete = _product(db_session, "1088", "BAGUETE KG", stock=2)
+    items = [{"product_id": bolo.id, "quantity": 4}, {"product_id": baguete.id, "quantity": 3}]
+
+    response = client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Estoque insuficiente para BAGUETE KG (disponível: 2, pedido: 3)."
+    # Nada foi gravado, nem a reserva do produto que tinha estoque
+    assert (_stock(db_session, bolo.id), _stock(db_session, baguete.id)) == (5, 2)
+    assert client.get("/api/v1/orders/", headers=normal_user_auth_headers).json() == []
+
+def test_order_with_non_positive_quantity_is_rejected(client: TestClient, db_session: Session, normal_user_auth_headers: dict, admin_auth_headers: dict):
+    baguete = _product(db_session, "1088", "BAGUETE KG", stock=5)
+    for quantity in (0, -100):
+        items = [{"product_id": baguete.id, "quantity": quantity}]
+        assert client.post("/api/v1/orders/", json={"items": items}, headers=normal_user_auth_headers).status_code == 422
+        assert client.post("/api/v1/orders/batch", json={"orders": [{"items": items}]}, headers=admin_auth_headers).status_code == 422
+    assert _stock(db_session, baguete.id) == 5
+    assert client.get("/api/v1/orders/", headers=admin_auth_headers).json() == []
+
+def test_stock_statements_refuse_non_positive_quantities():
+    for statement in (crud.reserve_stock_statement, crud.release_stock_statement):
+        with pytest.raises(ValueError):
+            statement(1, -100)
+
+def test_batch_refuses_only_orders_without_stock(client: TestClient, db_session: Session, admin_auth_headers: dict):
+    baguete = _product(db_session, "1088", "BAGUETE KG", stock=5)
+    sonho = _product(db_session, "3003", "SONHO", stock=10)
+    orders = [
+        {"items": [{"product_id": baguete.id, "quantity": 3}]},
+        {"items": [{"product_id": sonho.id, "quantity": 4}, {"product_id": baguete.id, "quantity": 3}]},  # Sem baguete para este
+        {"items": [{"product_id": baguete.id, "quantity": 2}, {"product_id": sonho.id, "quantity": 6}]},
+    ]
+
+    results = client.post("/api/v1/orders/batch", json={"orders": orders}, headers=admin_auth_headers).json()["results"]
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[1]["error"] == "Estoque insuficiente para BAGUETE KG (disponível: 5, pedido: 3)."
+    # A reserva de sonho do pedido recusado foi devolvida
+    assert (_stock(db_session, baguete.id), _stock(db_session, sonho.id)) == (0, 4)
+
+def test_stock_endpoints(client: TestClient, db_session: Session, admin_auth_headers: dict, normal_user_auth_headers: dict):
+    baguete = _product(db_session, "1088", "BAGUETE KG")
+    _product(db_session, "1302", "FARINHA DE ROSCA KG")
+
+    assert client.put(f"/api/v1/products/{baguete.id}/stock", json={"stock": 40}, headers=normal_user_auth_headers).status_code == 403
+    assert client.put(f"/api/v1/products/{baguete.id}/stock", json={"stock": -1}, headers=admin_auth_headers).status_code == 422
+    assert client.put("/api/v1/products/999/stock", json={"stock": 1}, headers=admin_auth_headers).status_code == 404
+    response = client.put(f"/api/v1/products/{baguete.id}/stock", json={"stock": 40}, headers=admin_auth_headers)
+    assert response.json() == {"id": baguete.id, "stock": 40}
+    assert client.get("/api/v1/products/stock", headers=normal_user_auth_headers).json() == [{"id": baguete.id, "stock": 40}]
+
+    client.put(f"/api/v1/products/{baguete.id}/stock", json={"stock": None}, headers=admin_auth_headers)
+    assert client.get("/api/v1/products/stock", headers=normal_user_auth_headers).json() == []
+
+# --- Concorrência ---
+# Muitos pedidos disputando os mesmos produtos populares: o total vendido nunca passa do
+# estoque inicial, e cada unidade vendida corresponde a um item gravado.
+
+def _popular_products(db_session: Session):
+    user = crud.create_user(db_session, schemas.UserCreate(username="balcao", email="balcao@test.com", password="password"))
+    stocks = {"1088": 60, "2001": 25, "3003": 40}
+    products = [_product(db_session, code, f"PRODUTO {code}", stock=stock) for code, stock in stocks.items()]
+    return user.id, [product.id for product in products], dict(zip((p.id for p in products), stocks.values()))
+
+def _random_orders(product_ids, n: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        schemas.OrderCreate(items=[
+            schemas.OrderItemCreate(product_id=product_id, quantity=rng.randint(1, 4))
+            for product_id in rng.sample(product_ids, rng.randint(1, len(product_ids)))
+        ])
+        for _ in range(n)
+    ]
+
+def _assert_no_oversell(db_session: Session, initial: dict, created: int, refused: int):
+    db_session.expire_all()
+    sold = dict.fromkeys(initial, 0)
+    for order in crud.get_all_orders(db_session, limit=10_000):
+        for item in order.items:
+            sold[item.product_id] += item.quantity
+    final = {product_id: _stock(db_session, product_id) for product_id in initial}
+    assert all(stock >= 0 for stock in final.values())
+    assert {product_id: initial[product_id] - sold[product_id] for product_id in initial} == final
+    assert len(crud.get_all_orders(db_session, limit=10_000)) == created
+    # A demanda supera o estoque: parte dos pedidos tem de ser recusada
+    assert created > 0 and refused > 0
+
+def test_concurrent_orders_never_oversell(db_session: Session, session_factory):
+    user_id, product_ids, initial = _popular_products(db_session)
+    outcomes = []
+
+    def counter(orders):
+        db = session_factory()
+        try:
+            for order_in in orders:
+                try:
+                    crud.create_order(db, order_in, user_id)
+                    outcomes.append(True)
+                except crud.InsufficientStockError:
+                    outcomes.append(False)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=counter, args=(_random_orders(product_ids, 15, seed),)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outcomes) == 60
+    _assert_no_oversell(db_session, initial, outcomes.count(True), outcomes.count(False))
+
+def test_concurrent_async_orders_never_oversell(db_session: Session, async_session_factory):
+    user_id, product_ids, initial = _popular_products(db_session)
+
+    async def place(order_in):
+        async with async_session_factory() as db:
+            try:
+                await crud_async.create_order(db, order_in, user_id)
+                return True
+            except crud.InsufficientStockError:
+                return False
+
+    async def burst():
+        return await asyncio.gather(*(place(order_in) for order_in in _random_orders(product_ids, 40, seed=7)))
+
+    outcomes = asyncio.run(burst())
+    _assert_no_oversell(db_session, initial, outcomes.count(True), outcomes.count(False))
@@ -0,0 +1,46 @@
+# tests/test_synthetic_data.py
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import schemas, crud, models, reports
+from app.synthetic_data import generate_dataset
+
+START, END = date(2024, 1, 1), date(2024, 1, 31)
+
+def _orders_signature(db_session: Session, first_order_id: int, first_user_id: int):
+    """Pedidos a partir de `first_order_id`, com IDs de usuário relativos ao primeiro usuário gerado."""
+    orders = db_session.query(models.Order).filter(models.Order.id >= first_order_id).order_by(models.Order.id).all()
+    return [
+        (order.user_id - first_user_id, order.created_at, [(item.product_id, item.quantity) for item in sorted(order.items, key=lambda i: i.id)])
+        for order in orders
+    ]
+
+def test_generate_dataset_is_reproducible_and_consistent(db_session: Session):
+    for i in range(50):
+        crud.create_product(db_session, schemas.ProductCreate(code=f"G{i:03d}", product_name=f"Produto {i}", unit="UN", price=1.0 + i))
+
+    result = generate_dataset(db_session, users=20, orders=300, start=START, end=END, seed=7, user_prefix="a", batch_size=128)
+    assert (result["users"], result["orders"]) == (20, 300)
+    assert db_session.query(func.count(models.OrderItem.id)).scalar() == result["items"]
+
+    # Datas dentro do período e total de cada pedido igual à soma dos itens
+    orders = db_session.query(models.Order).all()
+    assert all(START <= order.created_at.date() <= END for order in orders)
+    assert all(float(order.total_amount) == round(sum(float(i.price) * i.quantity for i in order.items), 2) for order in orders)
+
+    # O consolidado diário foi reconstruído a partir dos pedidos gerados
+    daily = reports.get_sales_by_day(db_session, START, END)
+    assert sum(row["quantity"] for row in daily) == db_session.query(func.sum(models.OrderItem.quantity)).scalar()
+
+    # Popularidade concentrada: os 5 produtos mais vendidos aparecem em boa parte dos itens
+    counts = Counter(product_id for (product_id,) in db_session.query(models.OrderItem.product_id))
+    assert sum(count for _, count in counts.most_common(5)) > result["items"] * 0.3
+
+    # Mesma semente, mesmos dados (a menos dos IDs, que continuam a partir dos existentes)
+    first_run = _orders_signature(db_session, 1, db_session.query(func.min(models.User.id)).filter(models.User.username.like("a%")).scalar())
+    next_order_id = db_session.query(func.max(models.Order.id)).scalar() + 1
+    generate_dataset(db_session, users=20, orders=300, start=START, end=END, seed=7, user_prefix="b", batch_size=128)
+    first_user_b = db_session.query(func.min(models.User.id)).filter(models.User.username.like("b%")).scalar()
+    assert _orders_signature(db_session, next_order_id, first_user_b) == first_run